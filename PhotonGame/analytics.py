@@ -0,0 +1,291 @@
+"""
+Post-game analytics over recorded match journals, with NumPy.
+
+load_match() maps a journal (journal.py) straight into a structured
+array, keeps the received packets, parses each distinct payload once
+(np.unique) and drops the same duplicates and retransmits as the live
+dedupe.DuplicateFilter, from the journal's per-packet arrival times. It
+then classifies every packet against a ruleset (rules.CLASSIC by
+default) and the roster saved beside the journal. The result is one
+flat array per field, one entry per packet: seconds since the 202 game
+start, shooter and target roster indexes, and masks for enemy tags,
+friendly fire and scored bases.
+
+analyze_match() computes everything else in whole-array passes:
+- the tagger x target hit matrix
+- time to first tag
+- tags per minute and friendly-fire rate per player
+- the team running totals, and the lead changes in them
+- base-capture timing
+
+analyze_season() spreads journals over a process pool.
+export_csv() writes one summary row per match and one row per player
+per match (see tools/analytics.py).
+"""
+import csv, os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .journal import HEADER, HEADER_SIZE, MAGIC, VERSION, RX, TX, load_roster
+from .net import parse_packet, EV_TAG, EV_BASE, EV_BARE, EV_MALFORMED
+from .rules import CLASSIC, TEAM_NAMES
+
+RECORD_DTYPE = np.dtype([("mono", "<i8"), ("dir", "u1"), ("len", "u1"), ("payload", "S22")])
+GAME_SECS = 6 * 60
+COUNTDOWN_SECS = 30
+RED, GREEN = 1, 2       # team codes, as in scoring.TEAMS
+
+
+class Match(NamedTuple):
+    match_id: str
+    arena: str
+    path: str
+    eqid: np.ndarray        # roster, sorted; index = player
+    pid: list
+    codename: list
+    team: np.ndarray        # RED/GREEN per player
+    t: np.ndarray           # seconds since game start, per kept packet
+    shooter: np.ndarray     # player index or -1
+    target: np.ndarray      # player index or -1 (tags only)
+    enemy: np.ndarray       # bool masks over the packets
+    friendly: np.ndarray
+    base: np.ndarray        # scored base captures
+    base_points: np.ndarray # points of each packet's base rule (0 if none)
+    packets: int
+    duplicates: int
+
+
+class MatchAnalysis(NamedTuple):
+    summary: dict
+    players: list           # one dict per player
+    hits: np.ndarray        # [tagger, target] -> hits, both players indexes
+    path: str               # the journal
+
+
+def _roster(path: str, ids: np.ndarray, base_codes):
+    saved = load_roster(path)
+    if saved is None:
+        # no saved roster: every id seen, entry screen's rule (even = green)
+        ids = ids[(ids >= 0) & ~np.isin(ids, base_codes)]
+        saved = [dict(eqid=int(e), pid=None, codename=None,
+                      team="green" if e % 2 == 0 else "red") for e in np.unique(ids)]
+    saved = sorted(saved, key=lambda r: r["eqid"])
+    eqid = np.array([r["eqid"] for r in saved], dtype=np.int64)
+    team = np.array([RED if r["team"] == "red" else GREEN for r in saved], dtype=np.int8)
+    return eqid, [r["pid"] for r in saved], [r["codename"] for r in saved], team
+
+
+def _index(eqid: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Roster index of each id, -1 where it is not on the roster."""
+    if eqid.size == 0:
+        return np.full(ids.shape, -1, dtype=np.int64)
+    i = np.searchsorted(eqid, ids).clip(0, eqid.size - 1)
+    return np.where(eqid[i] == ids, i, -1)
+
+
+def _duplicates(kind, tx, code, mono, window_ns: int) -> np.ndarray:
+    """
+    Mask of the packets dedupe.DuplicateFilter drops: the same (tx, code)
+    less than window_ns after the last *accepted* copy (malformed packets
+    are never dropped). A copy further than the window from the copy just
+    before it is always accepted, so only runs of close copies need the
+    sequential walk, which is a small share of any real match. Unlike the
+    live filter this has no capacity limit; the two differ only if more
+    than DEDUPE_CAPACITY packets were accepted within one window.
+    """
+    dup = np.zeros(mono.size, dtype=bool)
+    if window_ns <= 0 or mono.size < 2:
+        return dup
+    order = np.lexsort((mono, code, tx))       # stable: journal order on ties
+    s_tx, s_code, s_mono = tx[order], code[order], mono[order]
+    ok = kind[order] != EV_MALFORMED
+    close = ((s_tx[1:] == s_tx[:-1]) & (s_code[1:] == s_code[:-1]) & ok[1:] & ok[:-1]
+             & (np.diff(s_mono) < window_ns))
+    times = s_mono.tolist()
+    drop = []
+    prev, accepted = -2, 0
+    for i in (np.flatnonzero(close) + 1).tolist():
+        if i != prev + 1:
+            accepted = times[i - 1]     # copy before a run is always accepted
+        if times[i] - accepted < window_ns:
+            drop.append(i)
+        else:
+            accepted = times[i]
+        prev = i
+    dup[order[drop]] = True
+    return dup
+
+
+def load_match(path: str, spec: dict = CLASSIC, window_ms: float = 1000) -> Match:
+    data = np.fromfile(path, dtype=np.uint8)
+    magic, version, _, _wall0, mono0, arena, match_id = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a Photon journal")
+    n = (data.size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    recs = np.frombuffer(data, RECORD_DTYPE, count=n, offset=HEADER_SIZE)
+    unwritten = np.flatnonzero(recs["mono"] == 0)
+    if unwritten.size:
+        recs = recs[:unwritten[0]]      # crash: preallocated slots never written
+
+    # the game starts at the (first) 202; without one, after the countdown
+    sent = recs[recs["dir"] == TX]
+    starts = sent["mono"][sent["payload"] == b"202"]
+    start = starts[0] if starts.size else mono0 + COUNTDOWN_SECS * 10**9
+    rx = recs[recs["dir"] == RX]
+
+    payloads, key = np.unique(rx["payload"], return_inverse=True)
+    parsed = [parse_packet(p) for p in payloads]
+    kind = np.array([e.kind for e in parsed], dtype=np.int8)[key]
+    tx = np.array([e.tx for e in parsed], dtype=np.int64)[key]
+    code = np.array([e.code for e in parsed], dtype=np.int64)[key]
+    t = (rx["mono"] - start) / 1e9
+
+    keep = ~_duplicates(kind, tx, code, rx["mono"], int(window_ms * 1e6))
+    duplicates = int(rx.size - np.count_nonzero(keep))
+    kind, tx, code, t = kind[keep], tx[keep], code[keep], t[keep]
+
+    bases = spec.get("bases", ())
+    base_codes = np.array([b["code"] for b in bases], dtype=np.int64)
+    eqid, pid, codename, team = _roster(path, np.concatenate((tx, code)), base_codes)
+
+    is_base = np.isin(code, base_codes) & (kind != EV_BARE)
+    is_hit = ((kind == EV_TAG) | (kind == EV_BASE)) & ~is_base
+    shooter = _index(eqid, tx)
+    target = np.where(is_hit, _index(eqid, code), -1)
+    both = is_hit & (shooter >= 0) & (target >= 0)
+    team_of = np.append(team, 0)            # index -1 (not on the roster) -> no team
+    same = team_of[shooter] == team_of[target]
+    base_team = np.zeros(code.shape, dtype=np.int8)
+    base_points = np.zeros(code.shape, dtype=np.int64)
+    for b in bases:
+        at = code == b["code"]
+        base_team[at] = TEAM_NAMES.index(b["team"]) + 1
+        base_points[at] = b.get("points", 0)
+    scored = is_base & (team_of[shooter] == base_team)
+    return Match(match_id.rstrip(b"\0").decode("ascii", "replace"),
+                 arena.rstrip(b"\0").decode("utf-8", "replace"), path,
+                 eqid, pid, codename, team, t, shooter, target,
+                 both & ~same, both & same, scored, np.where(scored, base_points, 0),
+                 int(rx.size), duplicates)
+
+
+def analyze_match(path: str, spec: dict = CLASSIC, window_ms: float = 1000) -> MatchAnalysis:
+    m = load_match(path, spec, window_ms)
+    n = m.eqid.size
+    enemy, ff = spec["hits"]["enemy"], spec["hits"]["friendly"]
+    e_sh, e_tg = enemy.get("shooter", 0), enemy.get("target", 0)
+    f_sh, f_tg = ff.get("shooter", 0), ff.get("target", 0)
+
+    def count(idx):
+        return np.bincount(idx, minlength=n)
+
+    tags, tagged = count(m.shooter[m.enemy]), count(m.target[m.enemy])
+    ff_given, ff_taken = count(m.shooter[m.friendly]), count(m.target[m.friendly])
+    base_caps = count(m.shooter[m.base])
+    score = (e_sh * tags + e_tg * tagged + f_sh * ff_given + f_tg * ff_taken
+             + np.bincount(m.shooter[m.base], weights=m.base_points[m.base], minlength=n)
+             ).astype(np.int64)
+
+    hit = m.enemy | m.friendly
+    matrix = np.bincount(m.shooter[hit] * n + m.target[hit], minlength=n * n).reshape(n, n)
+
+    first_tag = np.full(n, np.nan)
+    np.fmin.at(first_tag, m.shooter[m.enemy], m.t[m.enemy])
+    minutes = GAME_SECS / 60
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ff_rate = np.where(tags + ff_given > 0, ff_given / (tags + ff_given), 0.0)
+
+    # team running totals, packet by packet, and who led after each
+    red = np.zeros(m.t.size, dtype=np.int64)
+    green = np.zeros(m.t.size, dtype=np.int64)
+    team_of = np.append(m.team, 0)
+    s_team, t_team = team_of[m.shooter], team_of[m.target]
+    for total, code in ((red, RED), (green, GREEN)):
+        total += np.where(m.enemy & (s_team == code), e_sh, 0)
+        total += np.where(m.enemy & (t_team == code), e_tg, 0)
+        total += np.where(m.friendly & (s_team == code), f_sh + f_tg, 0)
+        total += np.where(m.base & (s_team == code), m.base_points, 0)
+    red, green = np.cumsum(red), np.cumsum(green)
+    lead = np.sign(red - green)
+    lead = lead[lead != 0]
+    lead_changes = int(np.count_nonzero(lead[1:] != lead[:-1]))
+    red_total = int(red[-1]) if red.size else 0
+    green_total = int(green[-1]) if green.size else 0
+
+    base_t = m.t[m.base]
+    base_team = s_team[m.base]
+
+    def first(times):
+        return round(float(times.min()), 2) if times.size else None
+
+    top = None
+    if matrix.size and matrix.max() > 0:
+        a, b = np.unravel_index(matrix.argmax(), matrix.shape)
+        top = f"{m.eqid[a]}->{m.eqid[b]} ({matrix[a, b]})"
+    summary = dict(
+        match_id=m.match_id, arena=m.arena, journal=os.path.basename(m.path),
+        packets=m.packets, duplicates=m.duplicates, players=n,
+        red=red_total, green=green_total,
+        winner="red" if red_total > green_total else "green" if green_total > red_total else "tie",
+        lead_changes=lead_changes,
+        tags=int(tags.sum()), friendly_fire=int(ff_given.sum()),
+        ff_rate=round(float(ff_given.sum() / max(1, tags.sum() + ff_given.sum())), 4),
+        first_tag_s=first(m.t[m.enemy]),
+        bases_red=int(np.count_nonzero(base_team == RED)),
+        bases_green=int(np.count_nonzero(base_team == GREEN)),
+        first_base_red_s=first(base_t[base_team == RED]),
+        first_base_green_s=first(base_t[base_team == GREEN]),
+        top_pair=top,
+    )
+    players = [dict(
+        match_id=m.match_id, eqid=int(m.eqid[i]), pid=m.pid[i], codename=m.codename[i],
+        team=TEAM_NAMES[m.team[i] - 1], score=int(score[i]),
+        tags=int(tags[i]), tagged=int(tagged[i]), friendly_fire=int(ff_given[i]),
+        bases=int(base_caps[i]),
+        first_tag_s=None if np.isnan(first_tag[i]) else round(float(first_tag[i]), 2),
+        tags_per_min=round(float(tags[i] / minutes), 2),
+        ff_rate=round(float(ff_rate[i]), 4),
+    ) for i in range(n)]
+    return MatchAnalysis(summary, players, matrix, m.path)
+
+
+def _analyze(args):
+    path, spec, window_ms = args
+    try:
+        return analyze_match(path, spec, window_ms)
+    except (OSError, ValueError) as e:
+        print(f"[analytics] skipping {path}: {e}")
+        return None
+
+
+def analyze_season(paths, spec: dict = CLASSIC, window_ms: float = 1000,
+                   workers: Optional[int] = None) -> list:
+    """MatchAnalysis for every readable journal in `paths`, in order."""
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    jobs = [(p, spec, window_ms) for p in paths]
+    if workers == 1 or len(paths) < 2:
+        results = map(_analyze, jobs)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_analyze, jobs,
+                                    chunksize=max(1, len(jobs) // (workers * 4))))
+    return [r for r in results if r is not None]
+
+
+def export_csv(results, out_dir: str):
+    """Write matches.csv and players.csv into out_dir; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    out = []
+    for name, rows in (("matches.csv", [r.summary for r in results]),
+                       ("players.csv", [p for r in results for p in r.players])):
+        path = os.path.join(out_dir, name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            if rows:
+                w = csv.DictWriter(f, fieldnames=list(rows[0]))
+                w.writeheader()
+                w.writerows(rows)
+        out.append(path)
+    return out
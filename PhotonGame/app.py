@@ -1,42 +1,90 @@
-import asyncio, sys, os
+import asyncio, sys, os, time
 from PyQt5 import QtWidgets, QtCore
 from qasync import QEventLoop
 
-from .net import udp_sender, udp_receiver, Endpoints, endpoints_from_env
-from .scoring import State, handle_rx
+from .net import (UdpLink, ProcessUdpLink, Endpoints, endpoints_from_env, arenas_from_env,
+                  EV_TAG, EV_FRIENDLY, EV_BASE)
+from .scoring import State, handle_rx_batch, ack_repeats, MATCH_SECS
+from .rules import load_rules
+from .dedupe import DuplicateFilter
+from .ingest import IngestThread, apply_delta
+from .journal import open_match_journal, load_into_db, save_roster
+from . import snapshot, career
+from . import db
+from .directory import directory
+from . import config
 from .audio import init_audio, play_random_music, stop_music, play_sfx
 from . import build_main_window  # from package-local __init__.py
 from typing import Optional
 
+# Sound effect for each scored event kind
+EVENT_SFX = {EV_TAG: "hit", EV_FRIENDLY: "hitown", EV_BASE: "intruder"}
+
+
+_rules = None   # config.RULESET, compiled by the first new_state()
+
+
+def new_state() -> State:
+    global _rules
+    if _rules is None:
+        _rules = load_rules(config.RULESET)
+    return State(feed_capacity=config.FEED_CAPACITY, feed_spill=config.FEED_SPILL,
+                 debug=config.DEBUG, rules=_rules)
+
 
 class Controller(QtCore.QObject):
+    """One arena's game: its State, clock and UDP link."""
     updated = QtCore.pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, name: str = "Arena 1", endpoints: Optional[Endpoints] = None,
+                 snapshots: bool = True):
         super().__init__()
-        self.tx_queue = asyncio.Queue()
-        self.state = State()
+        self.name = name
+        self.state = new_state()
         self.tracks = []
         self.sfx = {}
+        self.audible = True     # ArenaConsole leaves it on only for the arena shown
         self.game_running = False
         self.seconds_left = 0
 
-        # Network endpoints + task handles
-        self.endpoints: Endpoints = endpoints_from_env()
-        self._stop_event: asyncio.Event | None = None
-        self._tasks: tuple[asyncio.Task, asyncio.Task] | tuple = ()
+        # Network endpoints + datagram link
+        self.endpoints: Endpoints = endpoints or endpoints_from_env()
+        self.link: Optional[UdpLink] = None
+        self._link_open: Optional[asyncio.Task] = None
+        self._on_rx = None
+        self.journal = None
+        self.dedupe = DuplicateFilter(config.DEDUPE_MS, config.DEDUPE_CAPACITY)
+
+        # Crash-safe snapshots: written off the Qt thread, debounced by a timer
+        self._snap = None
+        self._snap_timer = QtCore.QTimer(self)
+        self._snap_timer.setSingleShot(True)
+        self._snap_timer.timeout.connect(self._write_snapshot)
+        self._send_start_on_open = False
+        if snapshots and config.SNAPSHOT_DIR:
+            try:
+                os.makedirs(config.SNAPSHOT_DIR, exist_ok=True)
+                self._snap = snapshot.SnapshotWriter(self.snapshot_path())
+            except OSError as e:
+                print(f"[snapshot] not saving {name}: {e}", file=sys.stderr)
 
     def send_int(self, val: str):
-        self.tx_queue.put_nowait(int(val))
+        if self.link is not None:
+            self.link.send_int(val)
 
     # ---------- Game lifecycle ----------
     def start_pre_game(self):
         if self.game_running:
             return
-        self.seconds_left = 30 + 6 * 60
-        play_sfx(self.sfx, "start")
-        stop_music()
+        self.seconds_left = MATCH_SECS
+        if self.audible:
+            play_sfx(self.sfx, "start")
+            stop_music()
         self.game_running = True
+        self.state.timeline.clear()
+        self.state.record_second(0)
+        self._clear_dedupe()
+        self._start_journal()
 
     def tick(self):
         if not self.game_running:
@@ -44,45 +92,245 @@ class Controller(QtCore.QObject):
         if self.seconds_left == 0:
             return
         self.seconds_left -= 1
+        self.state.record_second(MATCH_SECS - self.seconds_left)
 
         if self.seconds_left == 6 * 60:
             self.send_int(202)  # game start
+        self.snapshot_soon()
 
         if self.seconds_left == 0:
-            for _ in range(3):
-                self.send_int(221)  # game end x3
-                QtCore.QThread.msleep(200)
-            # finish SFX + stop music
-            play_sfx(self.sfx, "end")
-            stop_music()
+            # game end x3, 200 ms apart (timers, so other arenas keep running)
+            self.send_int(221)
+            for i in (1, 2):
+                QtCore.QTimer.singleShot(200 * i, lambda: self.send_int(221))
+            QtCore.QTimer.singleShot(500, self._end_match)
+            # finish SFX + stop music (the mixer is shared: only when shown)
+            if self.audible:
+                play_sfx(self.sfx, "end")
+                stop_music()
             self.game_running = False
 
         self.updated.emit()
 
+    # ---------- Snapshots / resume ----------
+    def snapshot_path(self) -> str:
+        slug = "".join(c if c.isalnum() else "-" for c in self.name).strip("-") or "arena"
+        return os.path.join(config.SNAPSHOT_DIR, f"{slug}.snap")
+
+    def snapshot_soon(self):
+        """Snapshot within SNAPSHOT_MS; repeated calls before then coalesce."""
+        if self._snap is not None and not self._snap_timer.isActive():
+            self._snap_timer.start(config.SNAPSHOT_MS)
+
+    def _write_snapshot(self):
+        # encoding is under a millisecond (mostly the timeline); the file I/O is on the writer thread
+        self._snap.submit(snapshot.encode(self.state, self.seconds_left, self.game_running))
+
+    def resume(self) -> bool:
+        """
+        Restore State and clock from this arena's last snapshot, before
+        start_network(). Time spent down is taken off the clock.
+        """
+        if not config.SNAPSHOT_DIR:
+            return False
+        snap = snapshot.load(self.snapshot_path(), new_state)
+        if snap is None:
+            return False
+        self.state.feed.close()
+        self.state = snap.state
+        self.game_running = snap.running and snap.seconds_left > 0
+        if self.game_running:
+            down = max(0, (time.time_ns() - snap.wall_ns) // 1_000_000_000)
+            self.seconds_left = max(1, snap.seconds_left - down)
+            # nothing scored while we were down: carry the scores across the gap
+            for t in range(self.state.timeline.last + 1, MATCH_SECS - self.seconds_left + 1):
+                self.state.record_second(t)
+            # the 202 was due while we were down
+            self._send_start_on_open = snap.seconds_left > 6 * 60 >= self.seconds_left
+            self._start_journal()
+        else:
+            self.seconds_left = snap.seconds_left
+        print(f"[snapshot] {self.name}: resumed {len(self.state.players)} players, "
+              f"{self.seconds_left}s left")
+        return True
+
+    def close_snapshots(self):
+        if self._snap is not None:
+            self._write_snapshot()
+            self._snap.close()
+
+    # ---------- Match journal ----------
+    def _start_journal(self):
+        self._finish_journal()
+        try:
+            self.journal = open_match_journal(config.JOURNAL_DIR, self.name)
+        except OSError as e:
+            print(f"[journal] not recording {self.name}: {e}", file=sys.stderr)
+            self.journal = None
+        if self.link is not None:
+            self.link.journal = self.journal
+
+    def _finish_journal(self) -> Optional[str]:
+        """Stop recording and COPY the match into Postgres in the background."""
+        if self.journal is None:
+            return None
+        journal, self.journal = self.journal, None
+        if self.link is not None:
+            self.link.journal = None
+        path = journal.close()
+        db.submit(load_into_db, path).add_done_callback(_report_journal_load)
+        return path
+
+    def _end_match(self):
+        """Match over (after the last 221): persist it and credit careers."""
+        path = self._finish_journal()
+        d = self.dedupe
+        if d.suppressed:
+            print(f"[dedupe] {self.name}: suppressed {d.suppressed} of {d.seen} packets "
+                  f"({d.evicted} remembered for less than the window)")
+        roster = career.roster_of(self.state)
+        if path:
+            try:
+                save_roster(path, roster)
+            except OSError as e:
+                print(f"[journal] roster not saved: {e}", file=sys.stderr)
+        hits = self.state.hit_matrix()
+        if hits:
+            (tagger, target), n = max(hits.items(), key=lambda kv: kv[1])
+            self.state.add(f"Most hits: {tagger} -> {target} ({n})")
+            self.updated.emit()
+        db.submit(career.record_match, roster, self.state.leader) \
+            .add_done_callback(_report_career_update)
+
+    def _clear_dedupe(self):
+        # the filter belongs to the ingest thread once it runs
+        if isinstance(self.link, IngestThread):
+            self.link.submit("clear_dedupe")
+        else:
+            self.dedupe.clear()
+
+    # ---------- Roster (routed through the ingest thread when there is one) ----------
+    def set_player(self, eqid: int, team: str, codename: Optional[str] = None,
+                   pid: Optional[int] = None):
+        if isinstance(self.link, IngestThread):
+            self.link.submit("set_player", eqid, team, codename, pid)
+        else:
+            self.state.set_player(eqid, team, codename=codename, pid=pid)
+        self.snapshot_soon()
+
+    def reset_state(self):
+        if isinstance(self.link, IngestThread):
+            self.link.submit("reset")
+        else:
+            self.state.feed.close()
+            self.state = new_state()
+        self.snapshot_soon()
+
     # ---------- Networking (qasync-friendly) ----------
-    def start_network(self, on_rx_coro):
-        """Start UDP sender/receiver tasks for current endpoints."""
-        if self._stop_event is not None:
+    def start_network(self, on_scored):
+        """
+        Open the UDP link for current endpoints.
+        on_scored(kinds) runs on the Qt thread after each scored batch, with
+        the set of event kinds in it (see scoring.apply_event).
+        """
+        if self.link is not None:
             return
-        self._stop_event = asyncio.Event()
-        sender_task = asyncio.create_task(udp_sender(self.tx_queue, self.endpoints, self._stop_event))
-        receiver_task = asyncio.create_task(udp_receiver(on_rx_coro, self.endpoints, self._stop_event))
-        self._tasks = (sender_task, receiver_task)
+        self._on_rx = on_scored
+        opts = dict(max_batch=config.RX_BATCH_MAX, max_wait=config.RX_BATCH_WAIT_MS / 1000.0)
+        if config.INGEST_THREAD:
+            self.link = IngestThread(self.endpoints, self.state, self._on_deltas, new_state,
+                                     capacity=config.HANDOFF_CAPACITY, dedupe=self.dedupe,
+                                     **opts)
+        else:
+            link_cls = ProcessUdpLink if config.RX_PROCESSES else UdpLink
+            self.link = link_cls(self.endpoints, self._on_events, **opts)
+        self.link.journal = self.journal
+        self._link_open = asyncio.get_event_loop().create_task(self.link.open())
+        self._link_open.add_done_callback(_report_open_failure)
+        if self._send_start_on_open:
+            self._send_start_on_open = False
+            self._link_open.add_done_callback(lambda _t: self.send_int(202))
+
+    def _on_events(self, events, arrived):
+        # scoring on this (the Qt) thread, all events as one unit;
+        # arrived: each event's receive time, as journaled
+        events, repeats = self.dedupe.filter(events, arrived)
+        kinds = handle_rx_batch(self.state, events, self.send_int)
+        ack_repeats(self.state, repeats, self.send_int)
+        self._on_rx(kinds)
+        self.snapshot_soon()
+
+    def _on_deltas(self, deltas):
+        # already scored (and acked) by the ingest thread; mirror it here
+        kinds = set()
+        for delta in deltas:
+            self.state, k = apply_delta(self.state, delta, _no_send, new_state)
+            kinds |= k
+        self._on_rx(kinds)
+        self.snapshot_soon()
 
     async def stop_network(self):
-        if self._stop_event is None:
+        if self.link is None:
             return
-        self._stop_event.set()
-        for t in self._tasks:
-            t.cancel()
-        await asyncio.sleep(0.05)  # give sockets a moment to close
-        self._stop_event = None
-        self._tasks = ()
-
-    async def rebind_network(self, new_ep: Endpoints, on_rx_coro):
+        link, self.link = self.link, None
+        if not self._link_open.done():
+            self._link_open.cancel()
+        try:
+            await self._link_open
+        except (asyncio.CancelledError, OSError):
+            pass
+        link.close()
+        await link.wait_closed()
+        self._link_open = None
+
+    async def rebind_network(self, new_ep: Endpoints, on_scored=None):
+        on_scored = on_scored or self._on_rx
         await self.stop_network()
         self.endpoints = new_ep
-        self.start_network(on_rx_coro)
+        self.start_network(on_scored)
+
+
+def _no_send(_val):
+    pass
+
+
+class ArenaConsole(QtCore.QObject):
+    """
+    Every arena run by this host, and the one the operator UI is showing.
+    There is one mixer, so only the arena shown plays music and SFX.
+    """
+    switched = QtCore.pyqtSignal(object)   # Controller now shown
+
+    def __init__(self, arenas: list):
+        super().__init__()
+        self.arenas = arenas
+        self.current: Controller = arenas[0]
+        for ctrl in arenas:
+            ctrl.audible = ctrl is self.current
+
+    def switch(self, index: int):
+        ctrl = self.arenas[index]
+        if ctrl is not self.current:
+            self.current.audible = False
+            ctrl.audible = True
+            self.current = ctrl
+            self.switched.emit(ctrl)
+
+
+def _report_journal_load(f):
+    if f.exception() is not None:
+        print(f"[journal] could not load match into the database: {f.exception()}",
+              file=sys.stderr)
+
+
+def _report_career_update(f):
+    if f.exception() is not None:
+        print(f"[career] could not update career stats: {f.exception()}", file=sys.stderr)
+
+
+def _report_open_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[net] could not open UDP link: {task.exception()}", file=sys.stderr)
 
 
 def run_app():
@@ -91,68 +339,81 @@ def run_app():
     loop = QEventLoop(app)
     asyncio.set_event_loop(loop)
 
-    ctrl = Controller()
-    win, splash, entry, game, assets_path = build_main_window(ctrl)
+    console = ArenaConsole([Controller(name, ep) for name, ep in arenas_from_env()])
+    # --resume: carry on from the last snapshots (e.g. after a crash mid-game)
+    resumed = "--resume" in sys.argv and any([c.resume() for c in console.arenas])
+    win, splash, entry, game, assets_path = build_main_window(console)
 
     # audio after assets path known
     audio = init_audio(assets_path)
-    ctrl.tracks = audio["tracks"]
-    ctrl.sfx    = audio["sfx"]
+    for ctrl in console.arenas:
+        ctrl.tracks = audio["tracks"]
+        ctrl.sfx    = audio["sfx"]
 
-    # wire UI
+    # wire UI (always to the arena currently shown)
+    entry.arena = console.current
+    # a lookup finishes in the arena it was started in, whichever is shown by then
     entry.addPlayerRequested.connect(
-        lambda pid, codename, eqid, team: on_add_player(ctrl, entry, pid,  eqid, team, codename)
+        lambda pid, codename, eqid, team, arena: on_add_player(arena or console.current, entry, pid,  eqid, team, codename)
+    )
+    entry.rosterImported.connect(
+        lambda players, arena: on_import_roster(arena or console.current, entry, players)
     )
-    entry.startRequested.connect(lambda _secs=None: on_start(ctrl, win, game))
-    entry.clearRequested.connect(lambda: on_clear(ctrl, entry))
-    add_settings_button(entry, ctrl, win, game)  # Settings button
+    entry.startRequested.connect(lambda _secs=None: on_start(console.current, win, game))
+    entry.clearRequested.connect(lambda: on_clear(console.current, entry))
+    add_settings_button(entry, console, win, game)  # Settings button
+    if len(console.arenas) > 1:
+        add_arena_switcher(entry, console)
+        add_arena_switcher(game, console)
+    console.switched.connect(lambda ctrl: on_switch_arena(ctrl, entry, game))
 
     game.backRequested.connect(lambda: win.setCurrentIndex(1))
-    ctrl.updated.connect(lambda: game.refresh(ctrl.state, ctrl.seconds_left))
 
-    # timer tick
+    # timer tick (every arena keeps its own clock)
     tick_timer = QtCore.QTimer()
-    tick_timer.timeout.connect(ctrl.tick)
     tick_timer.start(1000)
 
-    # UDP coroutines share this loop
-    async def on_rx(line: str):
-        # Update scoring first
-        handle_rx(ctrl.state, line, ctrl.send_int)
-
-        # SFX selection
-        parts = line.split(":", 1)
-        if len(parts) == 2:
-            tx, rhs = parts[0].strip(), parts[1].strip()
-            if rhs in ("43", "53"):
-                # base scored
-                play_sfx(ctrl.sfx, "intruder")
-            else:
-                # player tag: decide friendly vs normal
-                try:
-                    tx_i, hit_i = int(tx), int(rhs)
-                    t_tx  = ctrl.state.team.get(tx_i)
-                    t_hit = ctrl.state.team.get(hit_i)
-                    if t_tx and t_hit and t_tx == t_hit:
-                        play_sfx(ctrl.sfx, "hitown")   # friendly fire
-                    else:
-                        play_sfx(ctrl.sfx, "hit")      # normal hit
-                except ValueError:
-                    pass
-
-        game.refresh(ctrl.state, ctrl.seconds_left)
-
-    # start network with the callback above
-    ctrl.start_network(on_rx)
-
-    win.setCurrentIndex(0)
-    splash.start()
+    for ctrl in console.arenas:
+        ctrl.updated.connect(lambda c=ctrl: c is console.current and game.refresh(c.state, c.seconds_left))
+        tick_timer.timeout.connect(ctrl.tick)
+        # start network with a callback bound to this arena
+        ctrl.start_network(_make_on_scored(console, ctrl, game))
+
+    for ctrl in console.arenas:
+        app.aboutToQuit.connect(ctrl._finish_journal)
+        app.aboutToQuit.connect(ctrl.close_snapshots)
+    # last: waits for the journal COPYs queued above
+    app.aboutToQuit.connect(db.shutdown)
+
+    directory.preload()     # fills while the splash is showing
+    if resumed:
+        # straight back to where we were; no splash
+        ctrl = console.current
+        on_switch_arena(ctrl, entry, game)
+        win.setCurrentIndex(2 if ctrl.game_running else 1)
+    else:
+        win.setCurrentIndex(0)
+        splash.start()
 
     # run unified loop
     with loop:
         sys.exit(loop.run_forever())
 
 
+def _make_on_scored(console: ArenaConsole, ctrl: Controller, game):
+    def on_scored(kinds):
+        if ctrl is not console.current:
+            return  # scored; nothing on screen to update
+
+        # SFX selection: one play per distinct effect per batch
+        for kind in kinds:
+            if kind in EVENT_SFX:
+                play_sfx(ctrl.sfx, EVENT_SFX[kind])
+
+        game.refresh(ctrl.state, ctrl.seconds_left)
+    return on_scored
+
+
 def on_add_player(
     ctrl: Controller,
     entry,
@@ -164,38 +425,67 @@ def on_add_player(
     try:
         eqid_int = int(eqid)
     except (TypeError, ValueError):
+        entry.cancel_pending(pid)
         QtWidgets.QMessageBox.warning(entry, "Invalid", f"Bad equipment id: {eqid!r}")
         return
 
     team = team.lower().strip()
 
-    if eqid_int in ctrl.state.team:
-        existing_team = ctrl.state.team[eqid_int]
+    shown = ctrl is entry.arena     # else the operator has switched arenas since
+    existing_team = ctrl.state.players.team_of(eqid_int)
+    if existing_team is not None:
+        entry.cancel_pending(pid)
+        where = "" if shown else f" in {ctrl.name}"
         QtWidgets.QMessageBox.warning(
             entry,
             "Equipment Conflict",
-            f"Equipment {eqid_int} is already assigned to {existing_team.upper()}!",
+            f"Equipment {eqid_int} is already assigned to {existing_team.upper()}{where}!",
         )
         return
 
-    row = entry.get_or_create_player(pid, codename)
-    print(row)
-    if row is None:
+    # the entry screen normally resolves (or creates) the player first;
+    # if not, it does so now on a database thread and asks again
+    if codename is None:
+        entry.cancel_pending(pid)
+        entry.lookup_player(pid, eqid_int, team, ctrl)
         return
 
-    if isinstance(row, dict):
-        pid2, codename2 = row.get("id"), row.get("codename")
-    else:
-        pid2, codename2 = row  # (id, codename)
-
-    ctrl.state.codename[eqid_int] = codename2
-    ctrl.state.team[eqid_int] = team
-    ctrl.state.eq_to_pid[eqid_int] = pid2   # <-- ADD THIS LINE
-
-    _ = ctrl.state.score[eqid_int]
+    ctrl.set_player(eqid_int, team, codename=codename, pid=pid)
 
     ctrl.send_int(eqid_int)
-    entry.add_to_roster(pid2, codename2, team)
+    if shown:
+        entry.add_to_roster(pid, codename, team)
+    else:
+        entry.cancel_pending(pid)   # listed from ctrl.state when its arena is shown again
+        print(f"[entry] player {pid} added to {ctrl.name}")
+
+
+def on_import_roster(ctrl: Controller, entry, players):
+    """players: [(pid, codename, eqid, team)] already resolved by the entry screen."""
+    shown = ctrl is entry.arena     # else the operator has switched arenas since
+    accepted = []
+    for pid, codename, eqid, team in players:
+        if ctrl.state.players.team_of(eqid) is not None:
+            entry.cancel_pending(pid)
+            print(f"[entry] equipment {eqid} already assigned; skipped player {pid}")
+            continue
+        if not shown and ctrl.state.counts.get(team, 0) >= 15:
+            entry.cancel_pending(pid)
+            print(f"[entry] {team} team full in {ctrl.name}; skipped player {pid}")
+            continue
+        ctrl.set_player(eqid, team, codename=codename, pid=pid)
+        accepted.append((pid, codename, eqid, team))
+
+    # broadcast every equipment id back to back, then update the tables
+    for _pid, _codename, eqid, _team in accepted:
+        ctrl.send_int(eqid)
+    for pid, codename, _eqid, team in accepted:
+        if shown:
+            entry.add_to_roster(pid, codename, team)
+        else:
+            entry.cancel_pending(pid)   # listed from ctrl.state when its arena is shown again
+    if accepted and not shown:
+        print(f"[entry] imported {len(accepted)} players into {ctrl.name}")
 
 
 def on_start(ctrl: Controller, win, game):
@@ -207,10 +497,30 @@ def on_start(ctrl: Controller, win, game):
 
 
 def on_clear(ctrl: Controller, entry):
-    ctrl.state = State()
+    ctrl.reset_state()
     entry.clear_rosters()
 
 
+def on_switch_arena(ctrl: Controller, entry, game):
+    st = ctrl.state
+    entry.load_rosters(
+        ((eqid if pid is None else pid, codename or "", team, eqid)
+         for eqid, pid, team, codename, _score in st.players.rows()),
+        ctrl,
+    )
+    game.refresh(st, ctrl.seconds_left)
+    game.sync_clock(ctrl.seconds_left, ctrl.game_running)
+
+
+def add_arena_switcher(screen, console: ArenaConsole):
+    box = QtWidgets.QComboBox()
+    box.addItems([c.name for c in console.arenas])
+    screen.layout().insertWidget(0, box, 0, QtCore.Qt.AlignLeft)
+    box.currentIndexChanged.connect(console.switch)
+    # keep every switcher showing the same arena
+    console.switched.connect(lambda ctrl: box.setCurrentIndex(console.arenas.index(ctrl)))
+
+
 # ---------------- Settings UI ----------------
 
 class SettingsDialog(QtWidgets.QDialog):
@@ -243,24 +553,27 @@ class SettingsDialog(QtWidgets.QDialog):
         )
 
 
-def add_settings_button(entry_screen_widget, ctrl: Controller, win, game):
+def add_settings_button(entry_screen_widget, console: ArenaConsole, win, game):
     btn = QtWidgets.QPushButton("Settings")
     entry_layout = entry_screen_widget.layout()
     entry_layout.addWidget(btn, 0, QtCore.Qt.AlignRight)
 
     def open_settings():
+        ctrl = console.current
         dlg = SettingsDialog(win, ctrl.endpoints)
+        dlg.setWindowTitle(f"Network Settings — {ctrl.name}")
         if dlg.exec_() == QtWidgets.QDialog.Accepted:
             new_ep = dlg.get_endpoints()
-            _write_env({
-                "PHOTON_SEND_ADDR": new_ep.send_addr,
-                "PHOTON_SEND_PORT": str(new_ep.send_port),
-                "PHOTON_BIND_ADDR": new_ep.recv_addr,
-                "PHOTON_RECV_PORT": str(new_ep.recv_port),
-            })
+            if len(console.arenas) == 1:
+                # multi-arena ports come from PHOTON_ARENAS; don't clobber .env
+                _write_env({
+                    "PHOTON_SEND_ADDR": new_ep.send_addr,
+                    "PHOTON_SEND_PORT": str(new_ep.send_port),
+                    "PHOTON_BIND_ADDR": new_ep.recv_addr,
+                    "PHOTON_RECV_PORT": str(new_ep.recv_port),
+                })
             async def do_rebind():
-                await ctrl.rebind_network(new_ep, lambda line: (handle_rx(ctrl.state, line, ctrl.send_int),
-                                                                game.refresh(ctrl.state, ctrl.seconds_left)))
+                await ctrl.rebind_network(new_ep)
             asyncio.get_event_loop().create_task(do_rebind())
 
     btn.clicked.connect(open_settings)
@@ -0,0 +1,67 @@
+"""
+Career statistics, aggregated once per finished match.
+
+At the end of a match the Controller hands record_match() the final
+roster: each player's score plus the combat stats State kept live as
+the match was scored (tags, times tagged, friendly fire, bases, best
+streak). On a database thread the per-player totals are upserted into
+player_career in one transaction (db.upsert_career). Lifetime
+leaderboards and the rank shown on the entry screen then read that
+summary table, never the event history.
+"""
+from typing import NamedTuple, Optional
+
+from . import db
+from .scoring import State, TEAMS
+
+
+class RosterEntry(NamedTuple):
+    eqid: int
+    pid: Optional[int]
+    team: str
+    codename: Optional[str]
+    score: int
+    tags: int = 0
+    tagged: int = 0
+    ff: int = 0
+    bases: int = 0
+    best_streak: int = 0
+
+
+def roster_of(state: State):
+    p = state.players
+    return [RosterEntry(eq, p.pid_of(eq), TEAMS[p.team[s]], p.codename[s], p.score[s],
+                        p.tags[s], p.tagged[s], p.ff[s], p.bases[s], p.best[s])
+            for s, eq in enumerate(p.eqid) if p.team[s]]
+
+
+def record_match(roster, winner: Optional[str]) -> int:
+    """Upsert this match into player_career; returns the players recorded."""
+    totals = {}     # pid -> [games, wins, tags, ff, bases, points]
+    for r in roster:
+        if r.pid is None:
+            continue    # auto-registered equipment, no player to credit
+        win = 1 if r.team == winner else 0
+        t = totals.get(r.pid)
+        if t is None:
+            totals[r.pid] = [1, win, r.tags, r.ff, r.bases, r.score]
+        else:
+            # one player on several pieces of equipment: still one game, and
+            # one row per pid, or the upsert would touch the same row twice
+            t[1] = max(t[1], win)
+            t[2] += r.tags
+            t[3] += r.ff
+            t[4] += r.bases
+            t[5] += r.score
+    rows = [(pid, *t) for pid, t in totals.items()]
+    db.upsert_career(rows)
+    return len(rows)
+
+
+def describe(stats) -> str:
+    """One line for the entry screen from db.get_career()."""
+    if not stats:
+        return "first game"
+    games, wins, tags, ff, bases, points, best, rank = stats
+    return (f"#{rank} · {games} games, {wins} wins · {tags} tags, {bases} bases, "
+            f"{ff} FF · {points:,} pts (best {best})")
@@ -7,10 +7,77 @@ SEND_PORT  = int(os.getenv("PHOTON_SEND_PORT", "7500"))
 RECV_ADDR  = os.getenv("PHOTON_BIND_ADDR", "0.0.0.0")
 RECV_PORT  = int(os.getenv("PHOTON_RECV_PORT", "7501"))
 
+# Receive batching: max datagrams handed to scoring per wakeup, and how long
+# (ms) to hold a short batch open for stragglers before flushing it.
+RX_BATCH_MAX     = int(os.getenv("PHOTON_RX_BATCH_MAX", "64"))
+RX_BATCH_WAIT_MS = float(os.getenv("PHOTON_RX_BATCH_WAIT_MS", "2"))
+
+# Give each arena's receive socket + packet parsing its own worker process
+# (arenas themselves are listed in PHOTON_ARENAS, see net.arenas_from_env)
+RX_PROCESSES = os.getenv("PHOTON_RX_PROCESSES", "0").lower() in ("1", "true", "yes")
+
+# Receive, parse and score on a dedicated thread per arena (see ingest.py);
+# the UI mirrors its State through a handoff of at most HANDOFF_CAPACITY deltas
+INGEST_THREAD    = os.getenv("PHOTON_INGEST_THREAD", "0").lower() in ("1", "true", "yes")
+HANDOFF_CAPACITY = int(os.getenv("PHOTON_HANDOFF_CAPACITY", "1024"))
+
+# Game screen redraws at most this many times per second
+RENDER_HZ = float(os.getenv("PHOTON_RENDER_HZ", "20"))
+
+# Ack but don't score a packet if the same tx:code was accepted less than
+# DEDUPE_MS earlier (duplicated datagrams, base-station retransmits); 0 turns
+# it off. Keep it above the base stations' retransmit interval, or a late
+# retransmit scores twice. DEDUPE_CAPACITY bounds how many recent packets
+# are remembered.
+DEDUPE_MS       = float(os.getenv("PHOTON_DEDUPE_MS", "1000"))
+DEDUPE_CAPACITY = int(os.getenv("PHOTON_DEDUPE_CAPACITY", "16384"))
+
+# Entry screen starfield: at most STARFIELD_STARS stars, fewer if drawing
+# them would take more than STARFIELD_BUDGET percent of one core
+STARFIELD_STARS  = int(os.getenv("PHOTON_STARFIELD_STARS", "220"))
+STARFIELD_BUDGET = float(os.getenv("PHOTON_STARFIELD_BUDGET", "2"))
+
+# Play-by-play keeps this many lines in memory; older ones are appended to
+# FEED_SPILL (if set) instead of being kept around
+FEED_CAPACITY = int(os.getenv("PHOTON_FEED_CAPACITY", "500"))
+FEED_SPILL    = os.getenv("PHOTON_FEED_SPILL") or None
+
 PG = dict(
     host=os.getenv("PGHOST", "127.0.0.1"),
     port=int(os.getenv("PGPORT", "5432")),
     dbname=os.getenv("PGDATABASE", "photon"),
     user=os.getenv("PGUSER", "postgres"),
     password=os.getenv("PGPASSWORD", "postgres"),
+    connect_timeout=int(os.getenv("PGCONNECT_TIMEOUT", "5")),
 )
+
+# Postgres connection pool size (at least 2: PG_POOL_MAX - 1 worker threads
+# plus the background player-insert thread), and how long (s) a pooled
+# connection may sit idle before it is checked with SELECT 1 on its next use
+PG_POOL_MIN     = int(os.getenv("PHOTON_PG_POOL_MIN", "1"))
+PG_POOL_MAX     = int(os.getenv("PHOTON_PG_POOL_MAX", "4"))
+PG_HEALTH_SECS  = float(os.getenv("PHOTON_PG_HEALTH_SECS", "30"))
+
+# Player directory (directory.py): max cached players, how many to preload
+# at startup (0 = up to DIRECTORY_SIZE), and age (s) after which a cached
+# codename is re-read in the background
+DIRECTORY_SIZE      = int(os.getenv("PHOTON_DIRECTORY_SIZE", "5000"))
+DIRECTORY_PRELOAD   = int(os.getenv("PHOTON_DIRECTORY_PRELOAD", "0"))
+DIRECTORY_TTL_SECS  = float(os.getenv("PHOTON_DIRECTORY_TTL_SECS", "300"))
+
+# Every datagram of a match is journaled to a file in JOURNAL_DIR (see
+# journal.py) and COPYed into match_events when the match ends; "" turns it off
+JOURNAL_DIR = os.getenv("PHOTON_JOURNAL_DIR", os.path.expanduser("~/.photon/journal"))
+
+# Each arena's State and clock are snapshotted into SNAPSHOT_DIR (see
+# snapshot.py) every second while a game runs and at most SNAPSHOT_MS after
+# any change; "" turns it off. Start with --resume to carry on from them.
+SNAPSHOT_DIR = os.getenv("PHOTON_SNAPSHOT_DIR", os.path.expanduser("~/.photon/snapshots"))
+SNAPSHOT_MS  = int(os.getenv("PHOTON_SNAPSHOT_MS", "250"))
+
+# Scoring rules: a JSON ruleset (see rules.py) compiled when the first arena
+# starts; "" plays the classic rules
+RULESET = os.getenv("PHOTON_RULESET") or None
+
+# Debug: re-verify State's running totals/ranks after every received batch
+DEBUG = os.getenv("PHOTON_DEBUG", "0").lower() in ("1", "true", "yes")
@@ -1,23 +1,308 @@
-import os, psycopg2
-from psycopg2.extras import RealDictCursor
-
-def _conn():
-	connection_params = {
-		'dbname': 'photon',
-		'user': 'student',
-		#'password': 'student',
-		#'host': 'localhost',
-		#'port': '5432'
-	}
-	con = psycopg2.connect(**connection_params)
-	return con
+"""
+Player table access over a shared connection pool.
+
+Connections come from config.PG and are reused across calls: each one
+gets the player lookup/insert prepared once (server-side PREPARE), is
+health-checked with SELECT 1 after sitting idle for PG_HEALTH_SECS, and
+is replaced transparently if the server dropped it.
+
+Nothing here should run on the Qt thread: submit() hands calls to a small
+executor (one worker fewer than the pool, leaving a connection for the
+write-behind queue), and write_behind.put() stores a new player in the
+background, retrying until the server is reachable again.
+"""
+import io, threading, time
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import pool as pgpool
+from psycopg2.extensions import connection as _PgConnection
+from psycopg2.extras import execute_values
+
+from . import config
+
+_PREPARE = (
+	"PREPARE photon_get_player(int) AS SELECT id,codename FROM players WHERE id=$1",
+	"PREPARE photon_add_player(int, text) AS "
+	"INSERT INTO players(id,codename) VALUES ($1,$2) RETURNING id,codename",
+)
+
+# errors that mean the connection (not the query) is broken
+_DISCONNECTS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+class _Conn(_PgConnection):
+	"""Pooled connection that remembers whether its statements are prepared."""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.prepared = False
+		self.last_used = time.monotonic()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+	global _pool
+	if _pool is None:
+		with _pool_lock:
+			if _pool is None:
+				_pool = pgpool.ThreadedConnectionPool(
+					config.PG_POOL_MIN, config.PG_POOL_MAX,
+					connection_factory=_Conn, **config.PG)
+	return _pool
+
+def close_pool():
+	"""Close every pooled connection (app shutdown). The next call reopens."""
+	global _pool
+	with _pool_lock:
+		if _pool is not None:
+			_pool.closeall()
+			_pool = None
+
+def _checkout():
+	p = _get_pool()
+	c = p.getconn()
+	try:
+		if c.closed:
+			raise psycopg2.InterfaceError("connection already closed")
+		if time.monotonic() - c.last_used > config.PG_HEALTH_SECS:
+			with c, c.cursor() as cur:
+				cur.execute("SELECT 1")
+		if not c.prepared:
+			with c, c.cursor() as cur:
+				for stmt in _PREPARE:
+					cur.execute(stmt)
+			c.prepared = True
+	except _DISCONNECTS:
+		p.putconn(c, close=True)
+		raise
+	except Exception:
+		p.putconn(c)
+		raise
+	return c
+
+def _transact(work):
+	"""
+	Return work(cursor), run in one transaction on a pooled connection.
+	A dead connection is discarded and the work retried once on a fresh one.
+	"""
+	p = _get_pool()
+	for attempt in (1, 2):
+		try:
+			c = _checkout()
+			try:
+				with c, c.cursor() as cur:
+					row = work(cur)
+			except _DISCONNECTS:
+				p.putconn(c, close=True)
+				raise
+			except Exception:
+				p.putconn(c)
+				raise
+		except _DISCONNECTS:
+			if attempt == 2:
+				raise
+			continue
+		c.last_used = time.monotonic()
+		p.putconn(c)
+		return row
+
+def _run(sql, params, fetch):
+	"""One statement; returns fetch(cursor)."""
+	def work(cur):
+		cur.execute(sql, params)
+		return fetch(cur)
+	return _transact(work)
+
+def _fetchone(sql, params):
+	return _run(sql, params, lambda cur: cur.fetchone())
 
 def get_player(pid:int):
-	with _conn() as c, c.cursor() as cur:
-		cur.execute("SELECT id,codename FROM players WHERE id=%s",(pid,))
-		return cur.fetchone()
+	return _fetchone("EXECUTE photon_get_player(%s)", (pid,))
 
 def add_player(pid:int, codename:str):
-	with _conn() as c, c.cursor() as cur:
-		cur.execute("INSERT INTO players(id,codename) VALUES (%s,%s) RETURNING id,codename",(pid,codename))
-		return cur.fetchone()
+	return _fetchone("EXECUTE photon_add_player(%s,%s)", (pid, codename))
+
+def get_players(pids):
+	"""(id, codename) for every id in pids that exists, in one query."""
+	pids = list(pids)
+	if not pids:
+		return []
+	return _run("SELECT id,codename FROM players WHERE id = ANY(%s)",
+		(pids,), lambda cur: cur.fetchall())
+
+def add_players(rows):
+	"""
+	Insert many (id, codename) rows with one multi-row INSERT. Ids that
+	already exist are skipped; returns the rows actually inserted.
+	"""
+	rows = list(rows)
+	if not rows:
+		return []
+	return _transact(lambda cur: execute_values(cur,
+		"INSERT INTO players(id,codename) VALUES %s "
+		"ON CONFLICT (id) DO NOTHING RETURNING id,codename",
+		rows, page_size=max(100, len(rows)), fetch=True))
+
+_MATCH_EVENTS = """
+CREATE TABLE IF NOT EXISTS match_events (
+	match_id  text        NOT NULL,
+	arena     text        NOT NULL,
+	seq       integer     NOT NULL,
+	direction text        NOT NULL,
+	mono_ns   bigint      NOT NULL,
+	at        timestamptz NOT NULL,
+	payload   bytea       NOT NULL,
+	PRIMARY KEY (match_id, arena, seq)
+)"""
+
+def copy_match_events(match_id:str, arena:str, records):
+	"""
+	Bulk-load journal records (see journal.Record) into match_events with
+	one COPY. Returns the number of rows.
+	"""
+	esc = lambda v: v.replace("\\", "\\\\").replace("\t", " ").replace("\n", " ")
+	match_id, arena = esc(match_id), esc(arena)
+	buf = io.StringIO()
+	n = 0
+	for n, r in enumerate(records, 1):
+		at = datetime.fromtimestamp(r.wall_ns / 1e9, timezone.utc).isoformat()
+		buf.write(f"{match_id}\t{arena}\t{n}\t{'tx' if r.direction else 'rx'}\t"
+			f"{r.mono_ns}\t{at}\t\\\\x{r.payload.hex()}\n")
+
+	def work(cur):
+		buf.seek(0)     # again on a retry
+		cur.execute(_MATCH_EVENTS)
+		cur.copy_expert("COPY match_events (match_id, arena, seq, direction, mono_ns, at, payload) "
+			"FROM STDIN", buf)
+	_transact(work)
+	return n
+
+_PLAYER_CAREER = """
+CREATE TABLE IF NOT EXISTS player_career (
+	player_id     integer     PRIMARY KEY,
+	games         integer     NOT NULL,
+	wins          integer     NOT NULL,
+	tags          integer     NOT NULL,
+	friendly_fire integer     NOT NULL,
+	base_captures integer     NOT NULL,
+	points        bigint      NOT NULL,
+	best_score    integer     NOT NULL,
+	last_played   timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS player_career_points ON player_career (points DESC)"""
+
+def upsert_career(rows):
+	"""
+	Add one match to player_career, in one transaction. rows are
+	(player_id, games, wins, tags, friendly_fire, base_captures, points).
+	"""
+	rows = [r + (r[6],) for r in rows]     # this match's points seed best_score
+	if not rows:
+		return
+	def work(cur):
+		cur.execute(_PLAYER_CAREER)
+		execute_values(cur,
+			"INSERT INTO player_career AS c (player_id, games, wins, tags, friendly_fire, "
+			"base_captures, points, best_score) VALUES %s "
+			"ON CONFLICT (player_id) DO UPDATE SET "
+			"games = c.games + EXCLUDED.games, wins = c.wins + EXCLUDED.wins, "
+			"tags = c.tags + EXCLUDED.tags, friendly_fire = c.friendly_fire + EXCLUDED.friendly_fire, "
+			"base_captures = c.base_captures + EXCLUDED.base_captures, "
+			"points = c.points + EXCLUDED.points, "
+			"best_score = GREATEST(c.best_score, EXCLUDED.best_score), last_played = now()",
+			rows, page_size=max(100, len(rows)))
+	_transact(work)
+
+def get_career(pid:int):
+	"""
+	(games, wins, tags, friendly_fire, base_captures, points, best_score, rank)
+	or None. Rank counts players with more points (index range on points).
+	"""
+	return _fetchone(
+		"SELECT c.games, c.wins, c.tags, c.friendly_fire, c.base_captures, c.points, "
+		"c.best_score, (SELECT count(*) FROM player_career r WHERE r.points > c.points) + 1 "
+		"FROM player_career c WHERE c.player_id = %s", (pid,))
+
+def load_players(limit:int=0):
+	"""All (id, codename) rows, or the `limit` highest ids (newest players)."""
+	if limit > 0:
+		return _run("SELECT id,codename FROM players ORDER BY id DESC LIMIT %s",
+			(limit,), lambda cur: cur.fetchall())
+	return _run("SELECT id,codename FROM players", None, lambda cur: cur.fetchall())
+
+# ---- background execution ----
+# Each worker holds at most one pooled connection and WriteBehind one
+# more, so the pool must have room for both.
+if config.PG_POOL_MAX < 2:
+	raise ValueError(f"PHOTON_PG_POOL_MAX={config.PG_POOL_MAX}: need at least 2 connections "
+		"(one for database workers, one for background player inserts)")
+_executor = ThreadPoolExecutor(max_workers=config.PG_POOL_MAX - 1,
+	thread_name_prefix="photon-db")
+
+def submit(fn, *args):
+	"""Run fn(*args) on a database worker thread; returns a Future."""
+	return _executor.submit(fn, *args)
+
+class WriteBehind:
+	"""
+	Player inserts that must not be lost: each put() is tried in the
+	background and, while the server is unreachable, retried with backoff
+	(1 s doubling to 30 s). An insert the server rejects for another reason
+	(e.g. the id already exists) is logged and dropped.
+	"""
+	def __init__(self):
+		self._q = deque()
+		self._wake = threading.Event()
+		self._stop = False
+		self._thread = None
+
+	def __len__(self):
+		return len(self._q)
+
+	def put(self, pid:int, codename:str):
+		self._q.append((pid, codename))
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._run, name="photon-db-writeback", daemon=True)
+			self._thread.start()
+		self._wake.set()
+
+	def _run(self):
+		backoff = 1.0
+		while not self._stop:
+			self._wake.wait()
+			self._wake.clear()
+			while self._q and not self._stop:
+				pid, codename = self._q[0]
+				try:
+					add_player(pid, codename)
+				except _DISCONNECTS as e:
+					print(f"[db] insert of player {pid} deferred ({len(self._q)} queued): {e}")
+					self._wake.wait(backoff)
+					self._wake.clear()
+					backoff = min(backoff * 2, 30.0)
+					continue
+				except Exception as e:
+					print(f"[db] insert of player {pid} dropped: {e}")
+				self._q.popleft()
+				backoff = 1.0
+
+	def close(self):
+		self._stop = True
+		self._wake.set()
+		if self._q:
+			print(f"[db] {len(self._q)} player insert(s) not written: "
+				+ ", ".join(f"{pid}={name}" for pid, name in self._q))
+
+write_behind = WriteBehind()
+
+def shutdown():
+	"""
+	App shutdown: finish the work already submitted (the last match's
+	journal COPY is queued by aboutToQuit just before this), then close
+	the pool. Player inserts still waiting for the server are reported.
+	"""
+	write_behind.close()
+	_executor.shutdown(wait=True, cancel_futures=False)
+	close_pool()
@@ -0,0 +1,95 @@
+"""
+Duplicate and retransmit suppression for received packets.
+
+Vests can deliver a datagram twice and base stations retransmit under
+interference; without this every copy would score. DuplicateFilter sits
+between the transport and scoring: a packet is held back if the same
+(tx, code) pair was accepted less than `window_ms` earlier, measured
+between the packets' own arrival times (the ones the journal records).
+Held-back repeats are not scored but are still acknowledged
+(scoring.ack_repeats): a base station retransmits because it missed the
+ack, so it must get one for the retransmit too. The window has to be
+longer than the retransmit interval, or a late retransmit scores again.
+
+Accepted keys go into a fixed ring of (key, arrival ns) and a dict from
+key to its latest arrival, so a check is one dict lookup and expiry pops
+from the ring's oldest end, amortised O(1) per packet with no rescans.
+If the ring fills inside one window the oldest key is forgotten early
+(counted in `evicted`) rather than growing memory.
+"""
+from array import array
+
+from .net import EV_MALFORMED
+
+
+class DuplicateFilter:
+    def __init__(self, window_ms: float = 1000, capacity: int = 16384):
+        self.window_ns = int(window_ms * 1e6)
+        self.capacity = max(1, int(capacity))
+        self.seen = 0
+        self.suppressed = 0
+        self.evicted = 0
+        self._keys = array("Q", bytes(8 * self.capacity))
+        self._times = array("q", bytes(8 * self.capacity))
+        self._head = 0          # oldest entry
+        self._len = 0
+        self._latest = {}       # key -> arrival ns of its newest accepted copy
+
+    def stats(self) -> dict:
+        return dict(seen=self.seen, suppressed=self.suppressed, evicted=self.evicted,
+                    tracked=self._len)
+
+    def filter(self, events, arrived) -> tuple:
+        """
+        (events to score, repeats to acknowledge only). arrived[i] is when
+        events[i] was received (monotonic ns, as recorded in the journal),
+        so a replay of the journal suppresses exactly what the live game did.
+        """
+        if self.window_ns <= 0:
+            return events, []
+        self.seen += len(events)
+        window, latest = self.window_ns, self._latest
+        out, repeats = None, []
+        for i, ev in enumerate(events):
+            if ev.kind != EV_MALFORMED:
+                self._expire(arrived[i] - window)
+                key = (ev.tx & 0xFFFFFFFF) << 32 | (ev.code & 0xFFFFFFFF)
+                if key in latest:
+                    self.suppressed += 1
+                    if out is None:
+                        out = list(events[:i])
+                    repeats.append(ev)
+                    continue
+                self._push(key, arrived[i])
+            if out is not None:
+                out.append(ev)
+        return (events if out is None else out), repeats
+
+    def _push(self, key: int, now_ns: int):
+        if self._len == self.capacity:
+            self._pop()
+            self.evicted += 1
+        tail = (self._head + self._len) % self.capacity
+        self._keys[tail] = key
+        self._times[tail] = now_ns
+        self._latest[key] = now_ns
+        self._len += 1
+
+    def _pop(self):
+        h = self._head
+        key = self._keys[h]
+        if self._latest.get(key) == self._times[h]:
+            del self._latest[key]
+        self._head = (h + 1) % self.capacity
+        self._len -= 1
+
+    def _expire(self, cutoff_ns: int):
+        times = self._times
+        while self._len and times[self._head] <= cutoff_ns:
+            self._pop()
+
+    def clear(self):
+        """Forget every key and zero the counters (a new match)."""
+        self._latest.clear()
+        self._head = self._len = 0
+        self.seen = self.suppressed = self.evicted = 0
@@ -0,0 +1,138 @@
+"""
+In-memory player directory in front of the players table.
+
+preload() bulk-loads the table (or the newest DIRECTORY_PRELOAD players)
+on a background thread while the splash screen is up. lookup() then
+answers from memory; entries older than DIRECTORY_TTL_SECS are still
+returned but re-read from the database in the background, and the least
+recently used entries are evicted past DIRECTORY_SIZE. Only misses wait
+on Postgres, and lookup_async() keeps even that off the caller's thread.
+"""
+import threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+from . import config, db
+
+
+class PlayerDirectory:
+    def __init__(self, capacity: int = 5000, ttl: float = 300.0, preload_limit: int = 0):
+        self.capacity = max(1, int(capacity))
+        self.ttl = ttl
+        self.preload_limit = preload_limit
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0          # hits served while a revalidation was queued
+        self.evictions = 0
+        self._entries = OrderedDict()   # pid -> (codename, loaded_at)
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return dict(size=size, hits=self.hits, misses=self.misses,
+                    stale=self.stale, evictions=self.evictions)
+
+    # ---- loading ----
+    def preload(self):
+        """Bulk-load in the background; returns the Future."""
+        return db.submit(self._preload)
+
+    def _preload(self):
+        try:
+            rows = db.load_players(self.preload_limit or self.capacity)
+        except Exception as e:
+            print(f"[directory] preload failed: {e}")
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            # oldest first, so the newest ids end up most recently used
+            for pid, codename in reversed(rows):
+                self._store(pid, codename, now)
+        print(f"[directory] preloaded {len(rows)} players")
+        return len(rows)
+
+    def _store(self, pid: int, codename: str, now: float):
+        e = self._entries
+        e[pid] = (codename, now)
+        e.move_to_end(pid)
+        while len(e) > self.capacity:
+            e.popitem(last=False)
+            self.evictions += 1
+
+    # ---- lookups (UI thread) ----
+    def lookup(self, pid: int) -> Optional[tuple]:
+        """(pid, codename) from memory, falling back to the database."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pid)
+            if entry is not None:
+                self._entries.move_to_end(pid)
+                self.hits += 1
+                codename, loaded_at = entry
+                if now - loaded_at > self.ttl and pid not in self._revalidating:
+                    self._revalidating.add(pid)
+                    self.stale += 1
+                    db.submit(self._revalidate, pid)
+                return pid, codename
+            self.misses += 1
+        row = db.get_player(pid)
+        if row:
+            self.put(*row)
+        return row
+
+    def lookup_async(self, pid: int) -> Future:
+        """Future of lookup(pid); already resolved when the player is cached."""
+        with self._lock:
+            cached = pid in self._entries
+        if cached:
+            f = Future()
+            f.set_result(self.lookup(pid))
+            return f
+        return db.submit(self.lookup, pid)
+
+    def lookup_many(self, pids) -> dict:
+        """{pid: codename} for every known pid; misses cost one query in total."""
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for pid in pids:
+                entry = self._entries.get(pid)
+                if entry is None:
+                    missing.append(pid)
+                    continue
+                self._entries.move_to_end(pid)
+                found[pid] = entry[0]
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            rows = db.get_players(missing)
+            with self._lock:
+                for pid, codename in rows:
+                    self._store(pid, codename, now)
+                    found[pid] = codename
+        return found
+
+    def put(self, pid: int, codename: str):
+        """Record a player just created (or read) elsewhere."""
+        with self._lock:
+            self._store(pid, codename, time.monotonic())
+
+    def _revalidate(self, pid: int):
+        try:
+            row = db.get_player(pid)
+        except Exception as e:
+            print(f"[directory] revalidate {pid} failed: {e}")
+            row = False     # keep serving the cached name
+        with self._lock:
+            self._revalidating.discard(pid)
+            if row:
+                self._store(*row, time.monotonic())
+            elif row is None:
+                self._entries.pop(pid, None)    # deleted from the table
+
+
+directory = PlayerDirectory(config.DIRECTORY_SIZE, config.DIRECTORY_TTL_SECS,
+                            config.DIRECTORY_PRELOAD)
@@ -0,0 +1,258 @@
+"""
+Threaded ingest: receive, parse and score packets off the Qt thread.
+
+The ingest thread owns the authoritative State: it reads the arena's
+socket, scores each batch and sends the acknowledgements itself, so
+packet-to-score latency does not depend on painting. Everything it applies
+is also published as a delta through a bounded Handoff; the Qt thread
+replays those deltas into its own mirror State (which the views read):
+
+  ("events", [Event, ...])                       a scored batch
+  ("set_player", eqid, team, codename, pid)      roster change from the UI
+  ("reset",)                                     Clear
+  ("snapshot", State)                            full copy after an overflow
+
+Roster changes made on the Qt thread are submitted to the ingest thread
+and come back through the same stream, so both copies see one order.
+
+Cost: "events" deltas carry the batch, not its effect, so the mirror
+scores every batch a second time (apply_delta -> handle_rx_batch, acks
+going to a no-op send). Scoring is a few microseconds per event and
+the mirror's share runs on the Qt thread, off the packet-to-ack path.
+"""
+import asyncio, select, socket, threading, time
+from collections import deque
+from typing import Optional
+
+from .dedupe import DuplicateFilter
+from .net import Endpoints, parse_packet, grow_rcvbuf, RECV_BUFSIZE
+from .scoring import State, handle_rx_batch, ack_repeats
+
+
+class Handoff:
+    """
+    Bounded single-producer/single-consumer queue. deque.append/popleft are
+    atomic in CPython, so neither side takes a lock; put() refuses instead of
+    blocking when the consumer has fallen `capacity` items behind.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(1, int(capacity))
+        self._q = deque()
+
+    def __len__(self):
+        return len(self._q)
+
+    def put(self, item) -> bool:
+        if len(self._q) >= self.capacity:
+            return False
+        self._q.append(item)
+        return True
+
+    def drain(self) -> list:
+        q = self._q
+        return [q.popleft() for _ in range(len(q))]
+
+
+def apply_delta(state: State, delta, send_int, make_state):
+    """
+    Apply one delta to `state`. Returns (state, kinds): the state to use from
+    now on (reset/snapshot replace it) and the event kinds scored.
+    """
+    op = delta[0]
+    if op == "events":
+        return state, handle_rx_batch(state, delta[1], send_int)
+    if op == "set_player":
+        state.set_player(*delta[1:])
+    elif op == "reset":
+        state.feed.close()
+        state = make_state()
+    elif op == "snapshot":
+        state.feed.close()
+        spill, timeline, state = state.feed.spill_path, state.timeline, delta[1]
+        state.feed.spill_path = spill
+        state.timeline = timeline   # sampled on this side, by the clock
+    return state, set()
+
+
+class IngestThread:
+    """
+    Same surface as net.UdpLink (open/send_int/close/wait_closed) plus
+    submit() for roster changes. on_deltas(list) runs on the event loop's
+    thread, at most one pending wakeup at a time.
+    """
+    IDLE = 0.5      # select() timeout while nothing happens
+
+    def __init__(self, ep: Endpoints, state: State, on_deltas, make_state,
+                 max_batch: int = 64, max_wait: float = 0.002, capacity: int = 1024,
+                 dedupe: Optional[DuplicateFilter] = None):
+        self.ep = ep
+        self.state = state.clone()          # thread-owned copy
+        self.handoff = Handoff(capacity)
+        self.dropped = 0                    # deltas replaced by a snapshot
+        self.journal = None                 # journal.Journal while a match is recorded
+        self.dedupe = dedupe                # used only by the ingest thread once open
+        self._on_deltas = on_deltas
+        self._make_state = make_state
+        self._max_batch = max(1, int(max_batch))
+        self._max_wait = max(0.0, max_wait)
+        self._commands = deque()
+        self._resync = False
+        self._wake_pending = False
+        self._stop = threading.Event()
+        self._loop = None
+        self._thread = None
+        self._rx = self._tx = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+
+    async def open(self):
+        self._loop = asyncio.get_running_loop()
+        self._rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        grow_rcvbuf(self._rx)
+        self._rx.bind((self.ep.recv_addr, self.ep.recv_port))
+        self._rx.setblocking(False)
+        self._tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._tx.setblocking(False)
+        self._tx.connect((self.ep.send_addr, self.ep.send_port))
+        self._thread = threading.Thread(
+            target=self._run, name=f"photon-ingest-{self.ep.recv_port}", daemon=True)
+        self._thread.start()
+
+    def send_int(self, val):
+        if self._tx is None:
+            return
+        data = str(int(val)).encode("ascii")
+        j = self.journal    # read once: the Qt thread may detach it
+        if j is not None:
+            j.tx(data)
+        try:
+            self._tx.send(data)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass
+
+    def submit(self, *delta):
+        """
+        Queue a non-packet change (set_player/reset/clear_dedupe) for the
+        ingest thread. While no thread runs (before open(), or because it
+        failed) the change is applied here and delivered at once instead
+        of waiting in a queue nobody drains.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._command(delta)
+            self._deliver()
+            return
+        self._commands.append(delta)
+        self._poke()
+
+    def close(self):
+        self._stop.set()
+        self._poke()
+
+    async def wait_closed(self):
+        if self._thread is not None:
+            await self._loop.run_in_executor(None, self._thread.join)
+            self._thread = None
+        for s in (self._rx, self._tx, self._wake_r, self._wake_w):
+            if s is not None:
+                s.close()
+        self._rx = self._tx = None
+        self._deliver()     # whatever the thread published last
+
+    # ---- ingest thread ----
+    def _run(self):
+        rx, wake = self._rx, self._wake_r
+        while not self._stop.is_set():
+            timeout = 0.05 if self._resync else self.IDLE
+            ready, _, _ = select.select((rx, wake), (), (), timeout)
+            if wake in ready:
+                self._drain_wake()
+                while self._commands:
+                    self._command(self._commands.popleft())
+            if rx in ready:
+                batch, arrived = self._read_batch(rx)
+                repeats = ()
+                if batch and self.dedupe is not None:
+                    batch, repeats = self.dedupe.filter(batch, arrived)
+                if batch:
+                    self._apply(("events", batch))
+                if repeats:
+                    ack_repeats(self.state, repeats, self.send_int)   # nothing to mirror
+            elif self._resync:
+                self._publish(None)
+
+    def _read_batch(self, rx):
+        """([Event, ...], [arrival monotonic ns, ...])"""
+        batch, arrived = [], []
+        deadline = None
+        while len(batch) < self._max_batch:
+            try:
+                data = rx.recv(RECV_BUFSIZE)
+                now = time.monotonic_ns()
+                j = self.journal
+                if j is not None:
+                    j.rx(data, now)
+                batch.append(parse_packet(data))
+                arrived.append(now)
+                continue
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                break
+            if not batch or self._max_wait <= 0:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self._max_wait
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select((rx,), (), (), remaining)[0]:
+                break
+        return batch, arrived
+
+    def _command(self, delta):
+        if delta[0] == "clear_dedupe":
+            if self.dedupe is not None:
+                self.dedupe.clear()     # the thread's own filter; nothing to mirror
+        else:
+            self._apply(delta)
+
+    def _apply(self, delta):
+        self.state, _ = apply_delta(self.state, delta, self.send_int, self._make_state)
+        self.state.feed.spill_path = None   # only the UI mirror spills to disk
+        self.state.take_dirty()     # nobody draws this copy
+        for r in self.state.ranks.values():
+            r.take_events()
+        self._publish(delta)
+
+    def _publish(self, delta):
+        if self._resync:
+            # consumer fell behind: skip deltas until a snapshot fits
+            if not self.handoff.put(("snapshot", self.state.clone())):
+                return
+            self._resync = False
+        elif delta is None or not self.handoff.put(delta):
+            if delta is not None:
+                self._resync = True
+                self.dropped += 1
+            return
+        if not self._wake_pending and self._thread is not None:
+            self._wake_pending = True
+            self._loop.call_soon_threadsafe(self._deliver)
+
+    def _poke(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(512):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    # ---- event loop thread ----
+    def _deliver(self):
+        self._wake_pending = False
+        deltas = self.handoff.drain()
+        if deltas:
+            self._on_deltas(deltas)
@@ -0,0 +1,170 @@
+"""
+Append-only binary journal of every datagram a match receives and sends.
+
+A journal file is preallocated (sparse) and memory-mapped, and every
+record is one fixed-size slot, so recording a packet is a slot number
+from an itertools.count (atomic under the GIL, no lock even with the
+ingest thread and the Qt thread both sending) and one struct.pack_into
+into the map. Layout (little endian):
+
+  header   64 bytes: magic "PHJ1", version, wall-clock and monotonic
+           anchors (ns) taken together at open, arena name, match id
+  record   32-byte slot: mono_ns (int64), direction (uint8: 0 rx, 1 tx),
+           length (uint8), payload (22 bytes, zero padded)
+
+Photon datagrams are a few bytes ("12:43"); longer ones keep their first
+22 bytes and their true length (capped at 255). Wall-clock time for a
+record is anchor_wall + (mono_ns - anchor_mono), so records carry one
+timestamp but both are recoverable. close() trims the file to what was
+written; after a crash the reader stops at the first zeroed slot.
+load_into_db() bulk-loads a finished journal into match_events with COPY.
+The final roster is saved beside it (save_roster) so a journal can be
+read later with teams and names (tools/replay, analytics).
+"""
+import itertools, json, mmap, os, struct, threading, time
+from typing import Iterator, NamedTuple, Optional
+
+MAGIC = b"PHJ1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHqq24s16s")     # exactly HEADER_SIZE
+HEADER_SIZE = 64
+RECORD = struct.Struct("<qBB22s")           # 32 bytes
+PAYLOAD_MAX = 22
+RX, TX = 0, 1
+
+
+class Record(NamedTuple):
+    direction: int      # RX or TX
+    mono_ns: int
+    wall_ns: int
+    payload: bytes
+    truncated: bool = False
+
+
+class Journal:
+    """
+    One match's journal file. rx()/tx() may be called from any thread.
+    The map is grown (under a lock, rarely) if a match outruns the
+    preallocation; a writer that raced the remap retries on the new map.
+    """
+    def __init__(self, path: str, arena: str = "", match_id: str = "",
+                 prealloc: int = 32 << 20):
+        self.path = path
+        self.match_id = match_id
+        self._slots = itertools.count()
+        self._grow_lock = threading.Lock()
+        self._size = HEADER_SIZE + max(1024, int(prealloc) // RECORD.size) * RECORD.size
+        self._f = open(path, "w+b")
+        self._f.truncate(self._size)
+        self._mm = mmap.mmap(self._f.fileno(), self._size)
+        wall, mono = time.time_ns(), time.monotonic_ns()
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, wall, mono,
+                         arena.encode("utf-8")[:24], match_id.encode("ascii")[:16])
+        self.records = 0    # set by close()
+
+    def rx(self, data: bytes, mono_ns: int = 0):
+        """mono_ns: when data arrived (the time duplicate suppression used); default now."""
+        self._append(RX, data, mono_ns)
+
+    def tx(self, data: bytes):
+        self._append(TX, data)
+
+    def _append(self, direction: int, data: bytes, mono_ns: int = 0):
+        off = HEADER_SIZE + next(self._slots) * RECORD.size
+        if off >= self._size:
+            self._grow(off + RECORD.size)
+        n = len(data)
+        for _ in (1, 2):
+            mm = self._mm
+            if mm is None:
+                return  # closed
+            try:
+                RECORD.pack_into(mm, off, mono_ns or time.monotonic_ns(), direction,
+                                 n if n < 256 else 255, data)
+                return
+            except ValueError:
+                continue    # map was swapped by _grow() underneath us
+
+    def _grow(self, need: int):
+        with self._grow_lock:
+            if self._mm is None or need <= self._size:
+                return
+            size = self._size
+            while size < need:
+                size = HEADER_SIZE + (size - HEADER_SIZE) * 2
+            old = self._mm
+            self._f.truncate(size)
+            self._mm = mmap.mmap(self._f.fileno(), size)
+            self._size = size
+            old.close()
+
+    def close(self) -> str:
+        """Trim to the slots used and close; returns the path."""
+        with self._grow_lock:
+            mm, self._mm = self._mm, None
+            if mm is None:
+                return self.path
+            self.records = next(self._slots)
+            mm.flush()
+            mm.close()
+            self._f.truncate(min(self._size, HEADER_SIZE + self.records * RECORD.size))
+            self._f.close()
+        return self.path
+
+
+def read_journal(path: str):
+    """(arena, match_id, iterator of Record) for a journal file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _, wall0, mono0, arena, match_id = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a Photon journal")
+
+    def records() -> Iterator[Record]:
+        for mono, direction, n, payload in RECORD.iter_unpack(
+                memoryview(data)[HEADER_SIZE:len(data) - (len(data) - HEADER_SIZE) % RECORD.size]):
+            if mono == 0:
+                break   # preallocated slot never written (crash)
+            yield Record(direction, mono, wall0 + (mono - mono0),
+                         payload[:n], n > PAYLOAD_MAX)
+
+    return (arena.rstrip(b"\0").decode("utf-8", "replace"),
+            match_id.rstrip(b"\0").decode("ascii", "replace"), records())
+
+
+def open_match_journal(directory: str, arena: str) -> Optional[Journal]:
+    """New journal for a match starting now, or None if journaling is off."""
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    match_id = time.strftime("%Y%m%d-%H%M%S")
+    slug = "".join(c if c.isalnum() else "-" for c in arena).strip("-") or "arena"
+    path = os.path.join(directory, f"{match_id}-{slug}.phj")
+    return Journal(path, arena=arena, match_id=match_id)
+
+
+def roster_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".roster.json"
+
+
+def save_roster(path: str, roster):
+    """Write roster entries (eqid, pid, team, codename, ...) beside journal `path`."""
+    rows = [dict(eqid=r.eqid, pid=r.pid, team=r.team, codename=r.codename) for r in roster]
+    with open(roster_path(path), "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+
+
+def load_roster(path: str) -> Optional[list]:
+    """[{eqid, pid, team, codename}] saved for journal `path`, or None."""
+    try:
+        with open(roster_path(path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_into_db(path: str) -> int:
+    """COPY a closed journal into match_events; returns the row count."""
+    from . import db
+    arena, match_id, records = read_journal(path)
+    return db.copy_match_events(match_id, arena, records)
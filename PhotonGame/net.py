@@ -1,5 +1,6 @@
-import asyncio, socket, os
+import asyncio, multiprocessing, os, socket, time
 from dataclasses import dataclass
+from typing import NamedTuple, Optional
 
 @dataclass
 class Endpoints:
@@ -16,27 +17,325 @@ def endpoints_from_env() -> Endpoints:
         recv_port=int(os.getenv("PHOTON_RECV_PORT", "7501")),
     )
 
-async def udp_sender(q: asyncio.Queue, ep: Endpoints, stop: asyncio.Event):
-    loop = asyncio.get_running_loop()
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.setblocking(False)
-    s.connect((ep.send_addr, ep.send_port))
+def arenas_from_env() -> list[tuple[str, Endpoints]]:
+    """
+    One (name, Endpoints) per arena run by this host.
+    PHOTON_ARENAS="Arena 1:7500:7501,Arena 2:7510:7511" lists
+    name:send_port:recv_port; addresses come from PHOTON_SEND_ADDR and
+    PHOTON_BIND_ADDR. Unset means a single arena on the PHOTON_* ports.
+    """
+    spec = os.getenv("PHOTON_ARENAS", "").strip()
+    base = endpoints_from_env()
+    if not spec:
+        return [("Arena 1", base)]
+    arenas = []
+    for item in spec.split(","):
+        name, send_port, recv_port = item.strip().rsplit(":", 2)
+        arenas.append((name.strip(), Endpoints(base.send_addr, int(send_port),
+                                               base.recv_addr, int(recv_port))))
+    return arenas
+
+# ---- wire events ----
+# Kinds of packet the equipment sends. parse_packet() can only tell a player
+# hit from a base hit; scoring.apply_event() upgrades EV_TAG to EV_FRIENDLY
+# once it has looked up both teams.
+EV_TAG, EV_FRIENDLY, EV_BASE, EV_BARE, EV_MALFORMED = range(5)
+BASE_CODES = (43, 53)
+
+class Event(NamedTuple):
+    kind: int
+    tx: int                 # transmitting equipment id (-1 for bare codes)
+    code: int               # hit equipment id, base code or bare code
+    raw: Optional[str] = None   # original text, only kept for malformed packets
+
+# Equipment only ever sends a few hundred distinct packets (30 ids x 32
+# targets), so parsed Events are immutable and shared via this cache.
+EVENT_CACHE_MAX = 4096
+_event_cache: dict = {}
+
+def parse_packet(buf, n: int = -1) -> Event:
+    """
+    Parse "tx:hit", "tx:43"/"tx:53" or a bare "code" straight from bytes
+    (bytes/bytearray/memoryview; only the first n bytes if n is given).
+    Surrounding ASCII whitespace is ignored. Repeat packets are answered
+    from a bounded cache without re-parsing; a bytes datagram is its own
+    cache key, so the receive loops' recv() result is never copied.
+    """
+    if type(buf) is bytes and n < 0:
+        key = buf
+    else:
+        key = bytes(buf) if n < 0 else bytes(buf[:n])
+    ev = _event_cache.get(key)
+    if ev is None:
+        ev = _parse(key)
+        if ev.kind != EV_MALFORMED:
+            if len(_event_cache) >= EVENT_CACHE_MAX:
+                _event_cache.clear()
+            _event_cache[key] = ev
+    return ev
+
+def _parse(data: bytes) -> Event:
+    tx, sep, rhs = data.partition(b":")
     try:
-        while not stop.is_set():
-            val = await q.get()
-            msg = str(val)
-            await loop.sock_sendall(s, msg.encode("ascii"))
-    finally:
-        s.close()
+        if not sep:
+            return Event(EV_BARE, -1, int(tx))
+        tx, rhs = int(tx), int(rhs)
+    except ValueError:
+        return Event(EV_MALFORMED, -1, -1, data.decode("ascii", "replace").strip())
+    return Event(EV_BASE if rhs in BASE_CODES else EV_TAG, tx, rhs)
+
+def packet_bytes(ev: Event) -> bytes:
+    """The datagram an Event was parsed from, in canonical form."""
+    if ev.kind == EV_MALFORMED:
+        return ev.raw.encode("ascii", "replace")
+    if ev.kind == EV_BARE:
+        return b"%d" % ev.code
+    return b"%d:%d" % (ev.tx, ev.code)
+
+# ---- datagram transport ----
+# The receive loops use recv(RECV_BUFSIZE), not recv_into() a reused buffer:
+# the event cache needs a hashable bytes key either way, and building one
+# from a memoryview slice costs more in CPython than recv()'s own allocation.
+RECV_BUFSIZE = 4096
+SOCK_RCVBUF = 1 << 20   # kernel-side queue; absorbs bursts of several thousand hits
+
+def grow_rcvbuf(sock):
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_RCVBUF)
+    except OSError:
+        pass    # capped by net.core.rmem_max; keep the default
+
+class _RxProtocol(asyncio.DatagramProtocol):
+    """
+    Parses each datagram in datagram_received and hands
+    on_batch(list[Event], list[arrival monotonic ns]) everything that arrived
+    within max_wait seconds (or max_batch events, whichever comes first).
+    No coroutine or task switch per packet.
+    """
+    def __init__(self, on_batch, max_batch: int, max_wait: float):
+        self.on_batch = on_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait)
+        self.closed = None
+        self.journal = None     # journal.Journal while a match is recorded
+        self._loop = None
+        self._batch = []
+        self._arrived = []
+        self._flush_handle = None
+
+    def connection_made(self, transport):
+        self._loop = asyncio.get_running_loop()
+        self.closed = self._loop.create_future()
+
+    def datagram_received(self, data, addr):
+        now = time.monotonic_ns()
+        if self.journal is not None:
+            self.journal.rx(data, now)
+        self._batch.append(parse_packet(data))
+        self._arrived.append(now)
+        if len(self._batch) >= self.max_batch:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.max_wait, self.flush)
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._batch:
+            batch, self._batch = self._batch, []
+            arrived, self._arrived = self._arrived, []
+            self.on_batch(batch, arrived)
+
+    def error_received(self, exc):
+        print(f"[net] receive error: {exc}")
+
+    def connection_lost(self, exc):
+        self.flush()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+
+class _TxProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.closed = None
+
+    def connection_made(self, transport):
+        self.closed = asyncio.get_running_loop().create_future()
 
-async def udp_receiver(on_line, ep: Endpoints, stop: asyncio.Event):
-    loop = asyncio.get_running_loop()
+    def error_received(self, exc):
+        # e.g. ECONNREFUSED when nothing listens on the send port yet
+        pass
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+
+class UdpLink:
+    """
+    Send/receive datagram endpoints for one Endpoints config.
+    send_int()/send_bytes() are a synchronous sendto(); values sent before open() finishes
+    are held and flushed once the socket exists. close() + wait_closed()
+    returns only after both sockets are really closed.
+    """
+    def __init__(self, ep: Endpoints, on_batch, max_batch: int = 64, max_wait: float = 0.002):
+        self.ep = ep
+        self._rx_proto = _RxProtocol(on_batch, max_batch, max_wait)
+        self._tx_proto = _TxProtocol()
+        self._rx = None
+        self._tx = None
+        self._pending = []
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self._rx, _ = await loop.create_datagram_endpoint(
+            lambda: self._rx_proto, local_addr=(self.ep.recv_addr, self.ep.recv_port))
+        grow_rcvbuf(self._rx.get_extra_info("socket"))
+        await self._open_tx()
+
+    async def _open_tx(self):
+        loop = asyncio.get_running_loop()
+        self._tx, _ = await loop.create_datagram_endpoint(
+            lambda: self._tx_proto, remote_addr=(self.ep.send_addr, self.ep.send_port))
+        pending, self._pending = self._pending, []
+        for data in pending:
+            self._tx.sendto(data)
+
+    def send_int(self, val):
+        self.send_bytes(str(int(val)).encode("ascii"))
+
+    @property
+    def journal(self):
+        """journal.Journal recording every datagram in and out, or None."""
+        return self._rx_proto.journal
+
+    @journal.setter
+    def journal(self, j):
+        self._rx_proto.journal = j
+
+    def send_bytes(self, data: bytes):
+        if self._rx_proto.journal is not None:
+            self._rx_proto.journal.tx(data)
+        if self._tx is None:
+            self._pending.append(data)
+        else:
+            self._tx.sendto(data)
+
+    def close(self):
+        for t in (self._rx, self._tx):
+            if t is not None:
+                t.close()
+
+    async def wait_closed(self):
+        waits = [p.closed for p, t in ((self._rx_proto, self._rx), (self._tx_proto, self._tx))
+                 if t is not None]
+        if waits:
+            await asyncio.gather(*waits)
+
+
+# ---- receive worker process (one per arena) ----
+def _rx_worker(ep: Endpoints, conn, stop, max_batch: int, max_wait: float):
+    """
+    Child-process body for ProcessUdpLink: owns the arena's receive socket,
+    parses datagrams and ships them to the parent in batches over `conn`.
+    """
     r = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    r.bind((ep.recv_addr, ep.recv_port))
-    r.setblocking(False)
+    grow_rcvbuf(r)
+    try:
+        r.bind((ep.recv_addr, ep.recv_port))
+    except OSError as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", None))
+    idle = 0.2  # how often to notice `stop` while nothing arrives
     try:
         while not stop.is_set():
-            data = await loop.sock_recv(r, 4096)
-            await on_line(data.decode("ascii").strip())
+            r.settimeout(idle)
+            try:
+                batch = [parse_packet(r.recv(RECV_BUFSIZE))]
+            except socket.timeout:
+                continue
+            arrived = [time.monotonic_ns()]     # CLOCK_MONOTONIC: same clock as the parent
+            deadline = time.monotonic() + max_wait
+            while len(batch) < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                r.settimeout(remaining)
+                try:
+                    batch.append(parse_packet(r.recv(RECV_BUFSIZE)))
+                except socket.timeout:
+                    break
+                arrived.append(time.monotonic_ns())
+            conn.send(("batch", batch, arrived))
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
     finally:
         r.close()
+
+
+class ProcessUdpLink(UdpLink):
+    """
+    UdpLink whose receive socket and packet parsing live in a dedicated
+    worker process, so one arena's traffic is read and parsed on its own
+    core. Parsed batches arrive over a pipe watched by the event loop;
+    sending stays a local sendto().
+    """
+    def __init__(self, ep: Endpoints, on_batch, max_batch: int = 64, max_wait: float = 0.002):
+        super().__init__(ep, on_batch, max_batch, max_wait)
+        self._proc = None
+        self._conn = None
+        self._stop = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe(duplex=False)
+        self._stop = ctx.Event()
+        self._proc = ctx.Process(
+            target=_rx_worker, daemon=True, name=f"photon-rx-{self.ep.recv_port}",
+            args=(self.ep, child, self._stop, self._rx_proto.max_batch, self._rx_proto.max_wait),
+        )
+        self._proc.start()
+        child.close()
+        kind, msg = await loop.run_in_executor(None, self._conn.recv)
+        if kind == "error":
+            raise OSError(msg)
+        loop.add_reader(self._conn.fileno(), self._drain_pipe)
+        await self._open_tx()
+
+    def _drain_pipe(self):
+        try:
+            while self._conn.poll():
+                _, batch, arrived = self._conn.recv()
+                j = self._rx_proto.journal
+                if j is not None:
+                    # raw bytes stay in the worker; journal the canonical form
+                    for ev, t in zip(batch, arrived):
+                        j.rx(packet_bytes(ev), t)
+                self._rx_proto.on_batch(batch, arrived)
+        except (EOFError, OSError):
+            # worker went away
+            asyncio.get_running_loop().remove_reader(self._conn.fileno())
+
+    def close(self):
+        if self._stop is not None:
+            self._stop.set()
+        if self._conn is not None:
+            try:
+                asyncio.get_event_loop().remove_reader(self._conn.fileno())
+            except (OSError, ValueError):
+                pass
+        super().close()
+
+    async def wait_closed(self):
+        await super().wait_closed()
+        if self._proc is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._proc.join, 1.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._proc = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,241 @@
+"""
+Scoring rules as data.
+
+A ruleset says what a hit is worth to the shooter and the target when
+they are on opposite teams, on the same team, or not both registered;
+which received codes are bases, which team may score each one, for how
+many points and whether it moves the base icon; and which ids are sent
+back as acknowledgements. CLASSIC below is the original game.
+
+compile_ruleset() turns a ruleset into Rules: a dict from base code to
+handler plus a tuple of handlers indexed by event kind (net.EV_*), with
+every point value, message and ack list bound into the handler when it
+is built. scoring.apply_event is then one dict lookup and one call per
+event, however many rules a mode has. Each handler has an ack-only twin
+(ack_codes/ack_kinds) that sends the same acknowledgements without
+scoring, for the repeats dedupe.DuplicateFilter holds back. New modes
+are JSON files of the same shape, chosen with PHOTON_RULESET.
+"""
+import json
+from typing import NamedTuple, Optional
+
+from .net import EV_TAG, EV_FRIENDLY, EV_BASE, EV_BARE, EV_MALFORMED
+
+CLASSIC = {
+    "name": "classic",
+    "hits": {
+        # points for each side of the hit, and whose ids are acknowledged
+        "enemy":    {"shooter": 10, "target": 0, "ack": ["target"]},
+        "friendly": {"shooter": -10, "target": -10, "ack": ["target", "shooter"]},
+        "unknown":  {"ack": ["target"]},   # either side unregistered: ignored
+    },
+    "bases": [
+        {"code": 53, "team": "green", "points": 100, "icon": True, "ack": ["shooter"]},
+        {"code": 43, "team": "red", "points": 100, "icon": True, "ack": ["shooter"]},
+    ],
+}
+
+TEAM_NAMES = ("red", "green")
+SHOOTER, TARGET = 0, 1
+ACK_ROLES = {"shooter": SHOOTER, "target": TARGET, "base": TARGET}
+
+
+class Rules(NamedTuple):
+    name: str
+    codes: dict         # base code -> handler(state, ev, send_int) -> kind
+    kinds: tuple        # event kind -> handler, for codes not in `codes`
+    ack_codes: dict     # base code -> ack-only handler(state, ev, send_int)
+    ack_kinds: tuple    # event kind -> ack-only handler
+
+
+def load_ruleset(path: Optional[str]) -> dict:
+    """The ruleset in a JSON file, or CLASSIC if path is empty."""
+    if not path:
+        return CLASSIC
+    with open(path, encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise ValueError(f"ruleset {path}: not valid JSON ({e})") from None
+
+
+def compile_ruleset(spec: dict, source: str = "") -> Rules:
+    """
+    Raises ValueError if spec is not a valid ruleset, naming the bad key
+    and `source` (where spec came from, e.g. the PHOTON_RULESET file).
+    """
+    where = "ruleset"
+    try:
+        _expect_object(spec)
+        where = "hits"
+        hits = spec["hits"]
+        _expect_object(hits)
+        parts = []
+        for key in ("enemy", "friendly", "unknown"):
+            where = "hits"
+            rule = hits.get(key, {}) if key == "unknown" else hits[key]
+            where = f"hits.{key}"
+            _expect_object(rule)
+            parts.append((_int(rule, "shooter"), _int(rule, "target"), _acks(rule)))
+        hit, hit_ack = _compile_hits(*parts)
+        codes, ack_codes = {}, {}
+        for i, base in enumerate(spec.get("bases", ())):
+            where = f"bases[{i}]"
+            _expect_object(base)
+            code = _int(base, "code", None)
+            if code < 0 or code in codes:
+                raise ValueError(f"bad or duplicate base code {code}")
+            codes[code], ack_codes[code] = _compile_base(code, base)
+    except KeyError as e:
+        raise ValueError(f"{_ruleset_name(spec, source)}: {where}: missing {e}") from None
+    except (TypeError, AttributeError, ValueError) as e:
+        raise ValueError(f"{_ruleset_name(spec, source)}: {where}: {e}") from None
+    kinds = [None] * (EV_MALFORMED + 1)
+    kinds[EV_TAG] = kinds[EV_FRIENDLY] = kinds[EV_BASE] = hit  # unknown base code: a hit
+    kinds[EV_BARE] = _ignored_bare
+    kinds[EV_MALFORMED] = _malformed
+    ack_kinds = [_no_ack] * (EV_MALFORMED + 1)
+    ack_kinds[EV_TAG] = ack_kinds[EV_FRIENDLY] = ack_kinds[EV_BASE] = hit_ack
+    return Rules(str(spec.get("name", "custom")), codes, tuple(kinds),
+                 ack_codes, tuple(ack_kinds))
+
+
+def load_rules(path: Optional[str]) -> Rules:
+    return compile_ruleset(load_ruleset(path), f"PHOTON_RULESET={path}" if path else "")
+
+
+def _ruleset_name(spec, source: str) -> str:
+    name = spec.get("name", "?") if isinstance(spec, dict) else "?"
+    return f"ruleset {name!r}" + (f" ({source})" if source else "")
+
+
+def _expect_object(value):
+    if not isinstance(value, dict):
+        raise TypeError(f"expected an object, not {value!r}")
+
+
+def _int(rule: dict, key: str, default: Optional[int] = 0) -> int:
+    """rule[key] as an int; KeyError if it is missing and there is no default."""
+    value = rule[key] if default is None else rule.get(key, default)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be an integer, not {value!r}") from None
+
+
+def _acks(rule: dict) -> tuple:
+    roles = rule.get("ack", ())
+    for r in roles:
+        if not isinstance(r, str) or r not in ACK_ROLES:
+            raise ValueError(f"unknown ack role {r!r}; use one of {sorted(ACK_ROLES)}")
+    return tuple(ACK_ROLES[r] for r in roles)
+
+
+def _points(shooter: int, target: int, each: bool) -> str:
+    if target == 0:
+        return f"{shooter:+d}"
+    if each and shooter == target:
+        return f"{shooter:+d} each"
+    return f"{shooter:+d}/{target:+d}"
+
+
+def _compile_hits(enemy: tuple, friendly: tuple, unknown: tuple):
+    """Each part is (shooter points, target points, ack roles)."""
+    e_sh, e_tg, e_ack = enemy
+    f_sh, f_tg, f_ack = friendly
+    u_ack = unknown[2]
+    e_pts, f_pts = _points(e_sh, e_tg, False), _points(f_sh, f_tg, True)
+
+    def hit(state, ev, send_int):
+        tx, code = ev.tx, ev.code
+        team_of = state.players.team_of
+        t_tx, t_hit = team_of(tx), team_of(code)
+        if not (t_tx and t_hit):
+            for r in u_ack:
+                send_int(code if r else tx)
+            state.add(
+                f"IGNORED hit {tx}->{code}: unknown team(s) "
+                f"(tx={t_tx}, hit={t_hit}). Register players first."
+            )
+            return EV_TAG
+        if t_tx == t_hit:
+            for r in f_ack:
+                send_int(code if r else tx)
+            if f_sh:
+                state.add_points(tx, f_sh)
+            if f_tg:
+                state.add_points(code, f_tg)
+            state.count_ff(tx, code)
+            state.add(f"FF: {tx} ↔ {code} ({f_pts})")
+            return EV_FRIENDLY
+        for r in e_ack:
+            send_int(code if r else tx)
+        if e_sh:
+            state.add_points(tx, e_sh)
+        if e_tg:
+            state.add_points(code, e_tg)
+        state.count_tag(tx, code)
+        state.add(f"{tx} tagged {code} ({e_pts})")
+        return EV_TAG
+
+    def hit_ack(state, ev, send_int):
+        tx, code = ev.tx, ev.code
+        team_of = state.players.team_of
+        t_tx, t_hit = team_of(tx), team_of(code)
+        roles = u_ack if not (t_tx and t_hit) else (f_ack if t_tx == t_hit else e_ack)
+        for r in roles:
+            send_int(code if r else tx)
+
+    return hit, hit_ack
+
+
+def _compile_base(code: int, rule: dict):
+    team = rule["team"]
+    if team not in TEAM_NAMES:
+        raise ValueError(f"base {code}: team must be one of {TEAM_NAMES}, not {team!r}")
+    points, icon, acks = _int(rule, "points"), bool(rule.get("icon", False)), _acks(rule)
+    label = team.capitalize()
+
+    def base(state, ev, send_int):
+        tx = ev.tx
+        if tx < 0:
+            # bare code: the base saw a capture but not who made it
+            state.add(f"{label} base scored ({points:+d}), scorer unknown.")
+            return EV_BARE
+        if state.players.team_of(tx) == team:
+            if points:
+                state.add_points(tx, points)
+            if icon:
+                state.set_base_icon(tx)     # only the latest scorer holds it
+            state.count_base(tx)
+            state.add(f"{label} base scored by {tx} ({points:+d}).")
+        else:
+            state.add(f"Inconsistent base event {code} from {tx} (team mismatch).")
+        for r in acks:
+            send_int(code if r else tx)
+        return EV_BASE
+
+    def base_ack(state, ev, send_int):
+        tx = ev.tx
+        if tx >= 0:
+            for r in acks:
+                send_int(code if r else tx)
+
+    return base, base_ack
+
+
+def _ignored_bare(state, ev, send_int):
+    state.add(f"Ignored bare code {ev.code}")
+    return EV_BARE
+
+
+def _malformed(state, ev, send_int):
+    state.add(f"Bad packet: {ev.raw}")
+    return EV_MALFORMED
+
+
+def _no_ack(state, ev, send_int):
+    pass
+
+
+CLASSIC_RULES = compile_ruleset(CLASSIC)
@@ -1,66 +1,504 @@
-from collections import defaultdict
+from array import array
+from bisect import bisect_left, insort
 from typing import Optional
 
-class State:
+from .net import Event, parse_packet, EV_MALFORMED
+from .rules import Rules, CLASSIC_RULES
+
+# Parts of the game screen that a State change can invalidate
+DIRTY_PARTS = ("totals", "feed", "red", "green", "base", "timeline", "stats")
+
+# Seconds on the game clock: 30 s pre-game countdown + 6:00 match
+MATCH_SECS = 30 + 6 * 60
+
+class FeedBuffer:
+    """
+    Fixed-capacity ring of play-by-play lines. append() is O(1); once full,
+    the oldest line is dropped (or written to spill_path if one is given).
+    `total` counts every line ever appended, so a view can tell how many
+    rows are new since it last looked.
+    """
+    def __init__(self, capacity: int = 500, spill_path: Optional[str] = None):
+        self.capacity = max(1, int(capacity))
+        self.spill_path = spill_path
+        self.total = 0
+        self._buf = [None] * self.capacity
+        self._start = 0
+        self._len = 0
+        self._spill = None
+
+    def append(self, line: str):
+        if self._len < self.capacity:
+            self._buf[(self._start + self._len) % self.capacity] = line
+            self._len += 1
+        else:
+            if self.spill_path:
+                self._spill_line(self._buf[self._start])
+            self._buf[self._start] = line
+            self._start = (self._start + 1) % self.capacity
+        self.total += 1
+
+    def _spill_line(self, line: str):
+        if self._spill is None:
+            self._spill = open(self.spill_path, "a", encoding="utf-8")
+        self._spill.write(line + "\n")
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("feed index out of range")
+        return self._buf[(self._start + i) % self.capacity]
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._buf[(self._start + i) % self.capacity]
+
+class RankIndex:
+    """
+    One team's players kept sorted by score (high -> low, ties by eqid).
+    Every change is also logged as a row event so a table model can replay
+    it as an insert/remove/move/dataChanged instead of rebuilding:
+      ("insert", row, eqid) ("remove", row) ("move", src, dst) ("changed", row)
+      ("reset",)  -- log overflowed; the consumer should reload everything
+    """
+    MAX_EVENTS = 512
+
+    def __init__(self):
+        self._keys = []     # sorted (-score, eqid)
+        self._score = {}    # eqid -> score as indexed
+        self.events = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, row) -> int:
+        return self._keys[row][1]
+
+    def __contains__(self, eqid):
+        return eqid in self._score
+
+    def row_of(self, eqid) -> int:
+        return bisect_left(self._keys, (-self._score[eqid], eqid))
+
+    def insert(self, eqid, score: int = 0):
+        key = (-score, eqid)
+        insort(self._keys, key)
+        self._score[eqid] = score
+        self._log("insert", bisect_left(self._keys, key), eqid)
+
+    def remove(self, eqid):
+        row = self.row_of(eqid)
+        del self._keys[row]
+        del self._score[eqid]
+        self._log("remove", row)
+
+    def update(self, eqid, score: int):
+        src = self.row_of(eqid)
+        del self._keys[src]
+        key = (-score, eqid)
+        dst = bisect_left(self._keys, key)
+        self._keys.insert(dst, key)
+        self._score[eqid] = score
+        if dst == src:
+            self._log("changed", dst)
+        else:
+            self._log("move", src, dst)
+
+    def touch(self, eqid):
+        """Log a content change (e.g. base icon) without a score change."""
+        self._log("changed", self.row_of(eqid))
+
+    def copy(self) -> "RankIndex":
+        r = RankIndex()
+        r._keys = list(self._keys)
+        r._score = dict(self._score)
+        r.events = [("reset",)]
+        return r
+
+    def clear(self):
+        self._keys.clear()
+        self._score.clear()
+        self.events = [("reset",)]
+
+    def take_events(self) -> list:
+        events, self.events = self.events, []
+        return events
+
+    def _log(self, *event):
+        if len(self.events) >= self.MAX_EVENTS:
+            self.events = [("reset",)]
+        elif not self.events or self.events[0] != ("reset",):
+            self.events.append(event)
+
+class Timeline:
+    """
+    Team totals and every player's score once per second of the match.
+    All arrays are allocated up front (per player: when the player first
+    appears), so record() only writes one int per team and per player
+    into second t; `last` is the newest second recorded (-1 = none).
+    `lo`/`hi` track the range of the team totals for graph scaling.
+    """
+    def __init__(self, seconds: int = MATCH_SECS):
+        self.length = seconds + 1       # samples 0..seconds
+        self.red = array("i", bytes(4 * self.length))
+        self.green = array("i", self.red)
+        self.players = []               # registry slot -> array of scores
+        self._zero = array("i", bytes(4 * self.length))
+        self.last = -1
+        self.lo = self.hi = 0
+
+    def record(self, t: int, state: "State"):
+        if not 0 <= t < self.length:
+            return
+        red, green = state.totals["red"], state.totals["green"]
+        self.red[t] = red
+        self.green[t] = green
+        self.lo = min(self.lo, red, green)
+        self.hi = max(self.hi, red, green)
+        rows, score = self.players, state.players.score
+        while len(rows) < len(score):
+            rows.append(array("i", self._zero))
+        for s, row in enumerate(rows):
+            row[t] = score[s]
+        self.last = max(self.last, t)
+
+    def copy(self) -> "Timeline":
+        tl = Timeline(self.length - 1)
+        tl.red[:] = self.red
+        tl.green[:] = self.green
+        tl.players = [array("i", row) for row in self.players]
+        tl.last, tl.lo, tl.hi = self.last, self.lo, self.hi
+        return tl
+
+    def clear(self):
+        """Zero every sample in place (new match, same players)."""
+        for a in (self.red, self.green, *self.players):
+            a[:] = self._zero
+        self.last = -1
+        self.lo = self.hi = 0
+
+# Team codes stored in PlayerRegistry.team
+TEAMS = (None, "red", "green")
+TEAM_CODE = {name: code for code, name in enumerate(TEAMS)}
+
+# PlayerRegistry.flags bits
+F_PID  = 1      # pid[] holds a player id
+F_BASE = 2      # holds the base icon
+
+# Per-player combat counters, one array('i') each in PlayerRegistry
+STATS = ("tags", "tagged", "ff", "bases", "streak", "best")
+
+class PlayerRegistry:
+    """
+    Every registered piece of equipment in a dense slot. `slot` is the only
+    hash lookup (eqid -> slot); per-player fields are typed arrays indexed
+    by slot, and `by_pid` is the reverse index (player id -> eqid).
+    The STATS arrays and the sparse `hits` matrix (tagger slot << 16 |
+    target slot -> hits, friendly fire included) are kept by State's
+    count_* methods.
+    Equipment is never unregistered during a game, only cleared with the
+    whole registry, so slots stay dense.
+    """
     def __init__(self):
-       self.team = {}         # eqid -> 'red'|'green'
-       self.codename = {}     # eqid -> string
-       self.score = defaultdict(int)
-       self.base_icon = set() # eqid that earned base icon
-       self.feed = []
-       self.eq_to_pid = {}    # eqid -> player-id (DB id, the one you want to display)
+        self.slot = {}              # eqid -> slot
+        self.eqid = array("i")      # slot -> equipment id
+        self.team = bytearray()     # slot -> TEAM_CODE (0 = none)
+        self.score = array("i")     # slot -> points
+        self.pid = array("i")       # slot -> player id (if flags & F_PID)
+        self.flags = bytearray()    # slot -> F_* bits
+        self.codename = []          # slot -> str or None
+        self.by_pid = {}            # player id -> eqid
+        self.tags = array("i")      # slot -> enemies tagged
+        self.tagged = array("i")    # slot -> times tagged by an enemy
+        self.ff = array("i")        # slot -> teammates hit
+        self.bases = array("i")     # slot -> bases captured
+        self.streak = array("i")    # slot -> tags since last tagged/FF
+        self.best = array("i")      # slot -> longest streak
+        self.hits = {}              # (tagger << 16 | target) slots -> count
+
+    def __len__(self):
+        return len(self.eqid)
+
+    def __contains__(self, eqid):
+        return eqid in self.slot
+
+    def __iter__(self):
+        return iter(self.eqid)
+
+    def add(self, eqid: int) -> int:
+        """Slot for eqid, allocating one (no team, 0 points) if needed."""
+        s = self.slot.get(eqid)
+        if s is None:
+            s = self.slot[eqid] = len(self.eqid)
+            self.eqid.append(eqid)
+            self.team.append(0)
+            self.score.append(0)
+            self.pid.append(0)
+            self.flags.append(0)
+            self.codename.append(None)
+            for name in STATS:
+                getattr(self, name).append(0)
+        return s
+
+    def set_pid(self, s: int, pid: int):
+        if self.flags[s] & F_PID:
+            self.by_pid.pop(self.pid[s], None)
+        self.pid[s] = pid
+        self.flags[s] |= F_PID
+        self.by_pid[pid] = self.eqid[s]
 
+    def team_of(self, eqid) -> Optional[str]:
+        s = self.slot.get(eqid)
+        return None if s is None else TEAMS[self.team[s]]
 
-    def add(self, s): self.feed.append(s)
+    def score_of(self, eqid) -> int:
+        s = self.slot.get(eqid)
+        return 0 if s is None else self.score[s]
+
+    def codename_of(self, eqid) -> Optional[str]:
+        s = self.slot.get(eqid)
+        return None if s is None else self.codename[s]
+
+    def pid_of(self, eqid) -> Optional[int]:
+        s = self.slot.get(eqid)
+        return self.pid[s] if s is not None and self.flags[s] & F_PID else None
+
+    def rows(self):
+        """(eqid, pid or None, team, codename, score) for every player on a team."""
+        for s, eq in enumerate(self.eqid):
+            if self.team[s]:
+                yield (eq, self.pid[s] if self.flags[s] & F_PID else None,
+                       TEAMS[self.team[s]], self.codename[s], self.score[s])
+
+    def copy(self) -> "PlayerRegistry":
+        r = PlayerRegistry()
+        r.slot = dict(self.slot)
+        r.eqid = array("i", self.eqid)
+        r.team = bytearray(self.team)
+        r.score = array("i", self.score)
+        r.pid = array("i", self.pid)
+        r.flags = bytearray(self.flags)
+        r.codename = list(self.codename)
+        r.by_pid = dict(self.by_pid)
+        for name in STATS:
+            setattr(r, name, array("i", getattr(self, name)))
+        r.hits = dict(self.hits)
+        return r
+
+    def clear(self):
+        self.__init__()
+
+class State:
+    """
+    Game state. Mutate players and scores only through set_player,
+    add_points and set_base_icon so the running totals, team counts, leader
+    and rank indexes stay in step with the registry.
+    """
+    def __init__(self, feed_capacity: int = 500, feed_spill: Optional[str] = None,
+                 debug: bool = False, rules: Rules = CLASSIC_RULES):
+       self.rules = rules     # compiled scoring rules (see rules.py)
+       self.players = PlayerRegistry()  # eqid -> team/score/pid/codename/flags
+       self.base_holder = None  # eqid that earned the base icon
+       self.feed = FeedBuffer(feed_capacity, feed_spill)
+       self.timeline = Timeline()  # per-second totals, see record_second()
+       self.ranks = {"red": RankIndex(), "green": RankIndex()}  # team -> players by score
+       self.totals = {"red": 0, "green": 0}   # team -> running score total
+       self.counts = {"red": 0, "green": 0}   # team -> members
+       self.leader = None     # 'red'|'green'|None (tied)
+       self.debug = debug     # run check_consistency() after every packet
+       self.dirty = set(DIRTY_PARTS)  # parts changed since the UI last drew
+
+
+    def clone(self) -> "State":
+        """Independent copy of the game (without the feed's spill file)."""
+        st = State(self.feed.capacity, None, self.debug, self.rules)
+        st.players = self.players.copy()
+        st.base_holder = self.base_holder
+        st.timeline = self.timeline.copy()
+        st.ranks = {team: r.copy() for team, r in self.ranks.items()}
+        st.totals = dict(self.totals)
+        st.counts = dict(self.counts)
+        st.leader = self.leader
+        for line in self.feed:
+            st.feed.append(line)
+        st.feed.total = self.feed.total
+        return st
+
+    def add(self, s):
+        self.feed.append(s)
+        self.dirty.add("feed")
+
+    def mark(self, *parts):
+        self.dirty.update(parts)
+
+    def record_second(self, t: int):
+        """Sample the scores into the timeline at second t of MATCH_SECS."""
+        self.timeline.record(t, self)
+        self.dirty.add("timeline")
+
+    def take_dirty(self) -> set:
+        parts, self.dirty = self.dirty, set()
+        return parts
+
+    def set_player(self, eqid: int, team: str, codename: Optional[str] = None,
+                   pid: Optional[int] = None):
+        """Put eqid on `team` (moving it if it was on another one)."""
+        p = self.players
+        s = p.add(eqid)
+        old = TEAMS[p.team[s]]
+        score = p.score[s]
+        if old is not None and old != team:
+            self.ranks[old].remove(eqid)
+            self.counts[old] -= 1
+            self.totals[old] -= score
+            self.dirty.add(old)
+        p.team[s] = TEAM_CODE[team]
+        if codename is not None:
+            p.codename[s] = codename
+        if pid is not None:
+            p.set_pid(s, pid)
+        ranks = self.ranks.setdefault(team, RankIndex())
+        if eqid in ranks:
+            ranks.touch(eqid)
+        else:
+            ranks.insert(eqid, score)
+        if old != team:
+            self.counts[team] = self.counts.get(team, 0) + 1
+            self.totals[team] = self.totals.get(team, 0) + score
+            self._update_leader()
+        self.dirty.update(("totals", team))
+
+    def add_points(self, eqid, delta: int):
+        p = self.players
+        s = p.slot.get(eqid)
+        if s is None:
+            return  # not registered: nothing to credit
+        score = p.score[s] = p.score[s] + delta
+        self.dirty.add("totals")
+        team = TEAMS[p.team[s]]
+        if team:
+            self.dirty.add(team)
+            self.ranks[team].update(eqid, score)
+            self.totals[team] += delta
+            self._update_leader()
+
+    def _update_leader(self):
+        red, green = self.totals["red"], self.totals["green"]
+        self.leader = "red" if red > green else ("green" if green > red else None)
+
+    def check_consistency(self):
+        """Recompute everything the running fields cache; raise on mismatch."""
+        p = self.players
+        for s, eq in enumerate(p.eqid):
+            assert p.slot[eq] == s, f"slot index for {eq} out of step"
+        for team in self.totals:
+            members = [eq for eq, _pid, t, _name, _score in p.rows() if t == team]
+            total = sum(p.score_of(e) for e in members)
+            assert self.counts[team] == len(members), \
+                f"{team} count {self.counts[team]} != {len(members)}"
+            assert self.totals[team] == total, \
+                f"{team} total {self.totals[team]} != {total}"
+            ranked = sorted(members, key=lambda e: (-p.score_of(e), e))
+            assert list(self.ranks[team]) == ranked, f"{team} rank index out of order"
+        red, green = self.totals["red"], self.totals["green"]
+        leader = "red" if red > green else ("green" if green > red else None)
+        assert self.leader == leader, f"leader {self.leader} != {leader}"
+
+    def set_base_icon(self, eqid: int):
+        """Make eqid the only holder of the base icon."""
+        p = self.players
+        prev = self.base_holder
+        if prev is not None:
+            p.flags[p.slot[prev]] &= ~F_BASE
+            self._touch(prev)
+        p.flags[p.add(eqid)] |= F_BASE
+        self.base_holder = eqid
+        self._touch(eqid)
+        self.dirty.add("base")
+
+    # ---- combat stats (called by the rules handlers, see rules.py) ----
+    # Plain array increments: no rank lookups, so the tables repaint their
+    # stat columns as a block when "stats" is dirty rather than row by row.
+    def count_tag(self, tx: int, target: int):
+        """tx tagged an enemy: both must be registered."""
+        p = self.players
+        a, b = p.slot[tx], p.slot[target]
+        p.tags[a] += 1
+        streak = p.streak[a] = p.streak[a] + 1
+        if streak > p.best[a]:
+            p.best[a] = streak
+        p.tagged[b] += 1
+        p.streak[b] = 0
+        key = a << 16 | b
+        p.hits[key] = p.hits.get(key, 0) + 1
+        self.dirty.add("stats")
+
+    def count_ff(self, tx: int, target: int):
+        """tx hit a teammate."""
+        p = self.players
+        a = p.slot[tx]
+        p.ff[a] += 1
+        p.streak[a] = 0
+        key = a << 16 | p.slot[target]
+        p.hits[key] = p.hits.get(key, 0) + 1
+        self.dirty.add("stats")
+
+    def count_base(self, tx: int):
+        self.players.bases[self.players.slot[tx]] += 1
+        self.dirty.add("stats")
+
+    def hit_matrix(self) -> dict:
+        """{(tagger eqid, target eqid): hits} for every pair that ever hit."""
+        eqid = self.players.eqid
+        return {(eqid[k >> 16], eqid[k & 0xFFFF]): n for k, n in self.players.hits.items()}
+
+    def has_base(self, eqid) -> bool:
+        s = self.players.slot.get(eqid)
+        return s is not None and bool(self.players.flags[s] & F_BASE)
+
+    def _touch(self, eqid):
+        team = self.players.team_of(eqid)
+        ranks = self.ranks.get(team)
+        if ranks is not None and eqid in ranks:
+            ranks.touch(eqid)
+            self.dirty.add(team)
     
     def register_players(self, players):
         """
         players: iterable of (pid, team, codename)
         pid should match exactly what comes over the wire in handle_rx.
         """
-        self.team.clear()
-        self.codename.clear()
-        self.score.clear()
-        self.base_icon.clear()
+        self.players.clear()
+        self.base_holder = None
+        for ranks in self.ranks.values():
+            ranks.clear()
+        for team in self.totals:
+            self.totals[team] = 0
+            self.counts[team] = 0
+        self.leader = None
 
         for pid, team, name in players:
             pid = int(pid)              # normalize to int
             team = team.lower().strip() # 'red' or 'green'
-            self.team[pid] = team
-            self.codename[pid] = name
-            self.score[pid] = 0
+            self.set_player(pid, team, name)
 
+        self.mark(*DIRTY_PARTS)
         self.add(f"Registered {len(players)} players.")
 
-def _award_base(state: "State", code: int, scorer_pid: Optional[int] = None):
-    if code == 53:
-        scoring_team = "green"
-    elif code == 43:
-        scoring_team = "red"
-    else:
-        return
-
-    if scorer_pid is not None:
-        if state.team.get(scorer_pid) == scoring_team:
-            state.score[scorer_pid] += 100
-
-            # *** make base_icon point ONLY at the latest scorer ***
-            state.base_icon.clear()
-            state.base_icon.add(scorer_pid)
+def _get_team(state, eqid):
+    return state.players.team_of(eqid)
 
-            state.add(f"{scoring_team.capitalize()} base scored by {scorer_pid} (+100).")
-        else:
-            state.add(f"Inconsistent base event {code} from {scorer_pid} (team mismatch).")
-    else:
-        state.add(f"{scoring_team.capitalize()} base scored (+100), scorer unknown.")
-
-def _get_team(state, pid):
-    return state.team.get(pid) or state.team.get(str(pid))
-
-def _is_base_code(rhs_int: int) -> bool:
-    # Base units are 43 and 53, period.
-    return rhs_int in (43, 53)
-    
 def _ensure_team(state: State, pid: int) -> str:
     """
     Return the team for this pid, auto-registering if needed.
@@ -71,60 +509,50 @@ def _ensure_team(state: State, pid: int) -> str:
         return team
 
     # Auto-assign: keep team sizes roughly balanced
-    red_count   = sum(1 for t in state.team.values() if t == "red")
-    green_count = sum(1 for t in state.team.values() if t == "green")
-
-    if red_count <= green_count:
+    if state.counts["red"] <= state.counts["green"]:
         team = "red"
     else:
         team = "green"
 
-    state.team[pid] = team
+    state.set_player(pid, team)
     state.add(f"Auto-registered pid={pid} as team {team}")
     return team
 
-def handle_rx(state: State, line: str, send_int):
+def apply_event(state: State, ev: Event, send_int) -> int:
+    """
+    Score one parsed packet with state.rules. Returns the event kind as
+    scored: EV_TAG hits between teammates come back as EV_FRIENDLY, so
+    callers (SFX) don't have to look the teams up again.
+    """
+    rules = state.rules
     try:
-        line = line.strip()
-        if ":" in line:
-            tx_str, rhs_str = line.split(":", 1)
-            tx = int(tx_str)
-            rhs = int(rhs_str.strip())
-
-            # 1) Base events: 43/53 on RHS
-            if _is_base_code(rhs):
-                _award_base(state, rhs, scorer_pid=tx)
-                send_int(tx)
-                #send_int(rhs)
-                return
-
-            # 2) Normal player hit
-            hit = rhs
-            send_int(hit)  # if this loops back, it will be a no-op on your side
-            t_tx  = _get_team(state, tx)
-            t_hit = _get_team(state, hit)
-            if not (t_tx and t_hit):
-                state.add(
-                    f"IGNORED hit {tx}->{hit}: unknown team(s) "
-                    f"(tx={t_tx}, hit={t_hit}). Register players first."
-                )
-                return
-
-            if t_tx == t_hit:
-                state.score[int(tx)]  -= 10
-                state.score[int(hit)] -= 10
-                send_int(tx)
-                state.add(f"FF: {tx} ↔ {hit} (-10 each)")
-            else:
-                state.score[int(tx)] += 10
-                state.add(f"{tx} tagged {hit} (+10)")
-
-        else:
-            # Bare codes (e.g., 43/53). Treat as base with unknown scorer.
-            code = int(line)
-            if _is_base_code(code):
-                _award_base(state, code, scorer_pid=None)
-            else:
-                state.add(f"Ignored bare code {code}")
+        return (rules.codes.get(ev.code) or rules.kinds[ev.kind])(state, ev, send_int)
     except Exception as e:
-        state.add(f"Bad packet: {line} ({e})")
+        state.add(f"Bad packet: {ev.tx}:{ev.code} ({e})")
+    return EV_MALFORMED
+
+def handle_rx(state: State, line, send_int) -> int:
+    """Parse and score one packet given as text or raw bytes."""
+    if isinstance(line, str):
+        line = line.encode("ascii", "replace")
+    return apply_event(state, parse_packet(line), send_int)
+
+def handle_rx_batch(state: State, events, send_int) -> set:
+    """
+    Score a batch of parsed Events in arrival order.
+    Returns the set of event kinds scored (see apply_event).
+    """
+    kinds = {apply_event(state, ev, send_int) for ev in events}
+    if state.debug:
+        state.check_consistency()
+    return kinds
+
+def ack_repeats(state: State, events, send_int):
+    """
+    Send the acknowledgements scoring these events would, without scoring
+    them: repeats held back by dedupe.DuplicateFilter. A base station
+    retransmits when it missed our ack, so each copy is answered again.
+    """
+    rules = state.rules
+    for ev in events:
+        (rules.ack_codes.get(ev.code) or rules.ack_kinds[ev.kind])(state, ev, send_int)
@@ -0,0 +1,210 @@
+"""
+Crash-safe snapshots of one arena's State and game clock.
+
+encode() packs everything needed to carry a match on (teams, codenames,
+scores, combat stats, base icon, player ids, clock, and the per-second
+timeline recorded so far) into one buffer, about 50 KB by the end of a
+full 30-player match, most of it timeline; decode() rebuilds a State
+from it through set_player, so ranks, totals and the leader come back
+consistent. SnapshotWriter writes on its own thread and
+replaces the file atomically (temp file, fsync, os.replace): a crash at
+any point leaves either the previous snapshot or the new one.
+
+Layout (little endian):
+
+  header   magic "PHS1", version, flags (1 = running), wall-clock ns,
+           seconds_left, base-icon eqid (-1 = none), player count
+  player   eqid, pid, score (int32 each), team (0 none, 1 red, 2 green),
+           flags (1 = has pid, 2 = has codename), codename length,
+           then the UTF-8 codename, then its STATS (int32 each)
+  hits     pair count, then (tagger eqid, target eqid, hits) int32 triples
+  timeline samples recorded n (Timeline.last + 1), player rows r, then n
+           int32 red totals, n green totals and r rows of n int32 scores
+           (registry slot order, the order the players are listed in)
+  trailer  CRC32 of everything before it
+"""
+import os, struct, sys, threading, time, zlib
+from array import array
+from typing import NamedTuple, Optional
+
+from .scoring import State, TEAMS, F_PID, STATS
+
+MAGIC = b"PHS1"
+VERSION = 3
+HEADER = struct.Struct("<4sHHqiiI")
+PLAYER = struct.Struct("<iiiBBB")
+PLAYER_STATS = struct.Struct("<" + "i" * len(STATS))
+COUNT = struct.Struct("<I")
+HIT = struct.Struct("<iii")
+TIMELINE = struct.Struct("<II")
+CRC = struct.Struct("<I")
+RUNNING = 1
+HAS_PID, HAS_NAME = 1, 2
+
+
+class Snapshot(NamedTuple):
+    state: State
+    seconds_left: int
+    running: bool
+    wall_ns: int        # when it was taken
+
+
+def encode(state: State, seconds_left: int, running: bool) -> bytes:
+    p = state.players
+    base = state.base_holder if state.base_holder is not None else -1
+    parts = [HEADER.pack(MAGIC, VERSION, RUNNING if running else 0, time.time_ns(),
+                         int(seconds_left), base, len(p))]
+    for s, eq in enumerate(p.eqid):
+        name = p.codename[s]
+        raw = name.encode("utf-8")[:255] if name is not None else b""
+        flags = (HAS_PID if p.flags[s] & F_PID else 0) | (HAS_NAME if name is not None else 0)
+        parts.append(PLAYER.pack(eq, p.pid[s], p.score[s], p.team[s], flags, len(raw)))
+        parts.append(raw)
+        parts.append(PLAYER_STATS.pack(*(getattr(p, name)[s] for name in STATS)))
+    hits = state.hit_matrix()
+    parts.append(COUNT.pack(len(hits)))
+    for (tagger, target), n in hits.items():
+        parts.append(HIT.pack(tagger, target, n))
+    tl = state.timeline
+    n = tl.last + 1
+    parts.append(TIMELINE.pack(n, len(tl.players)))
+    for row in (tl.red, tl.green, *tl.players):
+        parts.append(_le_bytes(row[:n]))
+    body = b"".join(parts)
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def decode(data: bytes, make_state=State) -> Snapshot:
+    """Raises ValueError if the data is not an intact snapshot."""
+    if len(data) < HEADER.size + CRC.size:
+        raise ValueError("snapshot truncated")
+    body, (crc,) = data[:-CRC.size], CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(body) != crc:
+        raise ValueError("snapshot checksum mismatch")
+    magic, version, flags, wall_ns, seconds_left, base, count = HEADER.unpack_from(body, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a Photon snapshot")
+
+    state = make_state()
+    off = HEADER.size
+    for _ in range(count):
+        eq, pid, score, team, pflags, n = PLAYER.unpack_from(body, off)
+        off += PLAYER.size
+        name = body[off:off + n].decode("utf-8", "replace") if pflags & HAS_NAME else None
+        off += n
+        if TEAMS[team] is not None:
+            state.set_player(eq, TEAMS[team], codename=name,
+                             pid=pid if pflags & HAS_PID else None)
+        else:
+            state.players.add(eq)
+        if score:
+            state.add_points(eq, score)
+        s = state.players.slot[eq]
+        for name, value in zip(STATS, PLAYER_STATS.unpack_from(body, off)):
+            getattr(state.players, name)[s] = value
+        off += PLAYER_STATS.size
+    (n_hits,) = COUNT.unpack_from(body, off)
+    off += COUNT.size
+    slot = state.players.slot
+    for tagger, target, n in HIT.iter_unpack(body[off:off + n_hits * HIT.size]):
+        state.players.hits[slot[tagger] << 16 | slot[target]] = n
+    off += n_hits * HIT.size
+    n, rows = TIMELINE.unpack_from(body, off)
+    off += TIMELINE.size
+    tl = state.timeline
+    if n > tl.length or off + 4 * n * (2 + rows) != len(body):
+        raise ValueError("snapshot timeline does not fit")
+    samples = []
+    for _ in range(2 + rows):
+        samples.append(_from_le_bytes(body[off:off + 4 * n]))
+        off += 4 * n
+    red, green, *players = samples
+    tl.red[:n], tl.green[:n] = red, green
+    for row in players:
+        tl.players.append(array("i", bytes(4 * tl.length)))
+        tl.players[-1][:n] = row
+    tl.last = n - 1
+    tl.lo = min(0, min(red, default=0), min(green, default=0))
+    tl.hi = max(0, max(red, default=0), max(green, default=0))
+    if base >= 0:
+        state.set_base_icon(base)
+    state.add(f"Resumed from snapshot ({len(state.players)} players).")
+    return Snapshot(state, seconds_left, bool(flags & RUNNING), wall_ns)
+
+
+def _le_bytes(a: array) -> bytes:
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _from_le_bytes(raw: bytes) -> array:
+    a = array("i", raw)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+
+def load(path: str, make_state=State) -> Optional[Snapshot]:
+    """The snapshot at path, or None if there is none (or it is damaged)."""
+    try:
+        with open(path, "rb") as f:
+            return decode(f.read(), make_state)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[snapshot] ignoring {path}: {e}")
+        return None
+
+
+class SnapshotWriter:
+    """
+    Writes the latest submitted snapshot to `path` on a background thread.
+    submit() only swaps a reference; if several arrive while a write is in
+    progress, only the newest is written.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.written = 0
+        self._latest = None
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="photon-snapshot", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes):
+        self._latest = data
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # read the flag before taking the data: close() comes after the
+            # final submit(), so once the flag is seen that data is in _latest;
+            # a close() during the write below wakes us for one more round
+            stop = self._stop
+            data, self._latest = self._latest, None
+            if data is not None:
+                try:
+                    self._write(data)
+                except OSError as e:
+                    print(f"[snapshot] write failed: {e}")
+            if stop:
+                return
+
+    def _write(self, data: bytes):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.written += 1
+
+    def close(self):
+        """Write whatever is pending, then stop."""
+        self._stop = True
+        self._wake.set()
+        self._thread.join(2.0)
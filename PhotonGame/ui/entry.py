@@ -1,55 +1,66 @@
 """
 Entry screen: starfield background + responsive UI.
 Exposes the signals/methods app.py expects:
-  - addPlayerRequested(int pid, object codenameOrNone, int eqid, str team)
+  - addPlayerRequested(int pid, object codenameOrNone, int eqid, str team, object arena)
+  - rosterImported(list of (pid, codename, eqid, team), object arena)
   - startRequested(int countdown_secs)
   - clearRequested()
-  - get_or_create_player(pid, codenameOrNone)
+  - lookup_player(pid, eqid, team, arena, codenameOrNone)
   - add_to_roster(pid, codename, team)
+  - cancel_pending(pid)
   - clear_rosters()
+  - load_rosters(players, arena)
+  - arena: the arena whose rosters are shown (set by the app)
 """
 
-import os, random
+import csv, json, os, time
 from typing import Optional
 
+import numpy as np
+
 from PyQt5.QtWidgets import (
     QWidget, QLineEdit, QLabel, QPushButton, QHBoxLayout, QVBoxLayout,
     QTableWidget, QTableWidgetItem, QSizePolicy, QMessageBox,
-    QFormLayout, QHeaderView, QShortcut, QInputDialog
+    QFormLayout, QHeaderView, QShortcut, QInputDialog, QFileDialog
 )
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QPainter, QColor, QPixmap, QKeySequence
+from PyQt5.QtGui import QPainter, QColor, QPixmap, QKeySequence, QBrush, QPolygonF
 
-from PhotonGame.db import get_player, add_player
+from PhotonGame import db, career, config
+from PhotonGame.directory import directory
 from PhotonGame import audio
 
 
 # ---------- Starfield Background ----------
-class Star:
-    def __init__(self, width, height):
-        self.width = width
-        self.height = height
-        self.reset()
-
-    def reset(self):
-        self.x = random.randint(0, self.width)
-        self.y = random.randint(0, self.height)
-        self.z = random.randint(1, max(2, self.width // 2))
-
-    def move(self, speed=5):
-        self.z -= speed
-        if self.z <= 0:
-            self.reset()
-
-
 class StarField(QWidget):
+    """
+    Stars flying out of the screen centre. Positions live in NumPy arrays
+    (offset from the centre, and depth) so a frame is a few whole-array
+    steps and one drawPoints call. The timer only runs while the widget is
+    shown, and the star count adapts so painting stays within
+    STARFIELD_BUDGET percent of one core, up to num_stars.
+    """
+    INTERVAL_MS = 30
+    SPEED = 5
+    MIN_STARS = 24
+
     def __init__(self, width=0, height=0, num_stars=200):
         super().__init__()
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.stars = [Star(1600, 900) for _ in range(num_stars)]
+        self.setAttribute(Qt.WA_OpaquePaintEvent)   # paintEvent fills every pixel
+        self.max_stars = max(1, num_stars)
+        self.num_stars = self.max_stars
+        self._rng = np.random.default_rng()
+        self._x = np.empty(self.max_stars)
+        self._y = np.empty(self.max_stars)
+        self._z = np.empty(self.max_stars)
+        self._size = (width or 1600, height or 900)
+        self._scatter(np.ones(self.max_stars, bool))
+        self._points = QPolygonF()
+        self._xy = None              # (n, 2) view onto _points' storage
+        self._frame_cost = 0.0       # moving average of paint time, seconds
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update)
-        self.timer.start(30)
         self.main_layout = QHBoxLayout()
         self.main_layout.setContentsMargins(16, 16, 16, 16)
         self.setLayout(self.main_layout)
@@ -57,40 +68,161 @@ class StarField(QWidget):
     def add_widget_layout(self, layout):
         self.main_layout.addLayout(layout)
 
+    def showEvent(self, event):
+        self.timer.start(self.INTERVAL_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def _scatter(self, mask):
+        """New random positions for the stars selected by mask."""
+        w, h = self._size
+        n = int(np.count_nonzero(mask))
+        self._x[mask] = self._rng.uniform(-w / 2, w / 2, n)
+        self._y[mask] = self._rng.uniform(-h / 2, h / 2, n)
+        self._z[mask] = self._rng.uniform(1, max(2, max(w, h) // 2), n)
+
+    def _buffer(self, n):
+        """An (n, 2) float array whose rows are the points of _points."""
+        if self._xy is None or len(self._xy) != n:
+            self._points = QPolygonF(n)
+            ptr = self._points.data()
+            ptr.setsize(n * 16)                      # n QPointF of 2 doubles
+            self._xy = np.frombuffer(ptr, np.float64).reshape(n, 2)
+        return self._xy
+
+    def _fit_budget(self, cost):
+        """Shrink or grow the star count to keep paint time within budget."""
+        self._frame_cost += (cost - self._frame_cost) * 0.1
+        budget = config.STARFIELD_BUDGET / 100 * self.INTERVAL_MS / 1000
+        if self._frame_cost > budget and self.num_stars > self.MIN_STARS:
+            self.num_stars = max(self.MIN_STARS, int(self.num_stars * 0.8))
+            self._frame_cost = budget
+        elif self._frame_cost < budget / 2 and self.num_stars < self.max_stars:
+            self.num_stars = min(self.max_stars, self.num_stars + 8)
+
     def paintEvent(self, event):
+        t0 = time.perf_counter()
+        w = max(1, self.width())
+        h = max(1, self.height())
+        self._size = (w, h)
+        n = self.num_stars
+        x, y, z = self._x[:n], self._y[:n], self._z[:n]
+
+        xy = self._buffer(n)
+        k = max(w, h) / 2 * 0.6
+        np.multiply(x, k, out=xy[:, 0])
+        np.multiply(y, k, out=xy[:, 1])
+        xy /= z[:, None]
+        xy += (w / 2, h / 2)
+
         painter = QPainter(self)
         painter.fillRect(self.rect(), QColor("black"))
         painter.setPen(QColor("white"))
-
-        w = max(1, self.width())
-        h = max(1, self.height())
-        cx = w / 2
-        cy = h / 2
-        depth_scale = max(w, h) / 2
-
-        for star in self.stars:
-            sx = int((star.x - cx) / max(1, star.z) * (depth_scale * 0.6) + cx)
-            sy = int((star.y - cy) / max(1, star.z) * (depth_scale * 0.6) + cy)
-            if 0 <= sx < w and 0 <= sy < h:
-                painter.drawPoint(sx, sy)
-            star.move(speed=5)
-            if star.z <= 0:
-                star.x = random.randint(0, w)
-                star.y = random.randint(0, h)
-                star.z = random.randint(1, max(2, int(depth_scale)))
+        painter.drawPoints(self._points)    # off-screen points are clipped
+        painter.end()
+
+        # advance; stars that reached the screen or left it start over
+        z -= self.SPEED
+        gone = (z <= 0) | (xy[:, 0] < 0) | (xy[:, 0] >= w) | (xy[:, 1] < 0) | (xy[:, 1] >= h)
+        if gone.any():
+            mask = np.zeros(self.max_stars, bool)
+            mask[:n] = gone
+            self._scatter(mask)
+        self._fit_budget(time.perf_counter() - t0)
+
+
+# ---------- Roster files ----------
+_ID_KEYS = ("player_id", "playerid", "pid", "id")
+_EQ_KEYS = ("equipment_id", "equipmentid", "eqid", "eq")
+_NAME_KEYS = ("codename", "name")
+
+def _pick(rec: dict, keys):
+    for k in keys:
+        if rec.get(k) not in (None, ""):
+            return rec[k]
+    return None
+
+def read_roster_file(path: str):
+    """
+    [(pid, eqid, codename or None)] from a CSV (optional header row) or JSON
+    (list of objects or of [pid, eqid, codename?] lists). Raises ValueError.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            items = json.load(f)
+            if not isinstance(items, list):
+                raise ValueError("expected a JSON list of players")
+        else:
+            items = [r for r in csv.reader(f) if any(c.strip() for c in r)]
+            if items and not items[0][0].strip().isdigit():
+                header = [h.strip().lower().replace(" ", "_") for h in items[0]]
+                items = [dict(zip(header, r)) for r in items[1:]]
+
+    rows = []
+    for n, item in enumerate(items, 1):
+        if isinstance(item, dict):
+            rec = {str(k).strip().lower(): v for k, v in item.items()}
+            pid, eqid, name = _pick(rec, _ID_KEYS), _pick(rec, _EQ_KEYS), _pick(rec, _NAME_KEYS)
+        elif isinstance(item, list):
+            pid, eqid, name = (item + [None, None, None])[:3]
+        else:
+            raise ValueError(f"entry {n}: expected an object or a "
+                             f"[player ID, equipment ID, codename] list, not {item!r}")
+        try:
+            pid, eqid = int(str(pid).strip()), int(str(eqid).strip())
+        except ValueError:
+            raise ValueError(f"entry {n}: player ID and equipment ID must be integers")
+        name = str(name).strip() if name not in (None, "") else None
+        rows.append((pid, eqid, name or None))
+    return rows
+
+def _resolve_roster(rows):
+    """
+    Database thread: codenames for every pid with one query, and one
+    multi-row insert for new players. Returns ({pid: codename}, new pids).
+    """
+    names = directory.lookup_many([pid for pid, _eqid, _name in rows])
+    new = {pid: name for pid, _eqid, name in rows if pid not in names and name}
+    if new:
+        try:
+            db.add_players(new.items())
+        except Exception as e:
+            print(f"[entry] bulk insert failed, queued for retry: {e}")
+            for pid, name in new.items():
+                db.write_behind.put(pid, name)
+        for pid, name in new.items():
+            directory.put(pid, name)
+        names.update(new)
+    return names, set(new)
 
 
 # ---------- EntryScreen ----------
 class EntryScreen(QWidget):
-    addPlayerRequested = pyqtSignal(int, object, int, str)
+    addPlayerRequested = pyqtSignal(int, object, int, str, object)   # ..., arena it was added in
     startRequested = pyqtSignal(int)
     clearRequested = pyqtSignal()
+    rosterImported = pyqtSignal(list, object)   # players, arena the import was started in
+    _lookupDone = pyqtSignal(int, object, object)   # pid, row or None, error or None
+    _importDone = pyqtSignal(list, object, object, object)  # rows, (names, new) or None, error or None, arena
+    _careerDone = pyqtSignal(int, str, object)      # pid, codename, career row or None
 
     def __init__(self, parent=None, assets_dir: str = ""):
         super().__init__(parent)
         self.assets_dir = assets_dir
         self._eqids = set()
         self._pending_eq = {}
+        # pid -> (team, codename, name item, eqid, arena) while looking up; the
+        # item is None while another arena's rosters are shown
+        self._pending_rows = {}
+        self.arena = None           # arena whose rosters are shown (set by the app)
+        self._import_skipped = []
+        self._career_pid = None
+        self._lookupDone.connect(self._on_lookup_done)
+        self._importDone.connect(self._on_import_done)
+        self._careerDone.connect(self._on_career_done)
         self._build_ui()
         self._update_start_enabled()
         assets_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets"))
@@ -103,7 +235,7 @@ class EntryScreen(QWidget):
 
     def _build_ui(self):
         self.setMinimumSize(900, 560)
-        self.starfield = StarField(1024, 640, num_stars=220)
+        self.starfield = StarField(1024, 640, num_stars=config.STARFIELD_STARS)
         root = QVBoxLayout(self)
         root.setContentsMargins(0, 0, 0, 0)
         root.addWidget(self.starfield)
@@ -177,7 +309,10 @@ class EntryScreen(QWidget):
         self.lookup_btn.setStyleSheet("background-color:#555; color:white; padding:6px 10px;")
         self.start_btn = QPushButton("Start (F5)")
         self.clear_btn = QPushButton("Clear (F12)")
+        self.import_btn = QPushButton("Import Roster…")
+        self.import_btn.setStyleSheet("background-color:#555; color:white; padding:6px 10px;")
         btn_row.addWidget(self.lookup_btn)
+        btn_row.addWidget(self.import_btn)
         btn_row.addStretch()
         btn_row.addWidget(self.start_btn)
         btn_row.addWidget(self.clear_btn)
@@ -195,6 +330,7 @@ class EntryScreen(QWidget):
         self.starfield.add_widget_layout(main_layout)
 
         self.lookup_btn.clicked.connect(self._emit_add)
+        self.import_btn.clicked.connect(self._import_roster)
         self.start_btn.clicked.connect(lambda: self._emit_start_if_ready(30))
         self.clear_btn.clicked.connect(self.clearRequested.emit)
         QShortcut(QKeySequence("F5"), self, activated=lambda: self._emit_start_if_ready(30))
@@ -231,51 +367,185 @@ class EntryScreen(QWidget):
             QMessageBox.warning(self, "Team Full", "Max 15 players per team.")
             return
 
-        self._pending_eq[pid] = eqid
-        try:
-            player_row = self.get_or_create_player(pid, codename)
-        except ValueError as e:
-            QMessageBox.warning(self, "Codename required", str(e))
-            self.result_label.setText("Player creation canceled.")
-            self._pending_eq.pop(pid, None)
-            return
-
-        if player_row is None:
-            self.result_label.setText("Player creation canceled.")
-            self._pending_eq.pop(pid, None)
+        if pid in self._pending_rows:
+            self.result_label.setText(f"Player {pid} is still being looked up…")
             return
 
-        if isinstance(player_row, tuple):
-            pid_resolved, codename_resolved = player_row
-        else:
-            pid_resolved = player_row.get("id")
-            codename_resolved = player_row.get("codename")
-
-        self.addPlayerRequested.emit(pid_resolved, codename_resolved, eqid, team)
-        self.result_label.setText(
-            f"Queued: Player {pid_resolved} ({'new' if codename else 'lookup'}), eq {eqid}, team {team}"
-        )
+        self.lookup_player(pid, eqid, team, self.arena, codename)
         self.eq_input.clear()
         self.id_input.clear()
         self._update_team_hint()
 
-    def get_or_create_player(self, pid: int, codename: Optional[str]):
-        row = get_player(pid)
+    def lookup_player(self, pid: int, eqid: int, team: str, arena,
+                      codename: Optional[str] = None):
+        """
+        Resolve pid (creating the player if needed) and then emit
+        addPlayerRequested for `arena`. The lookup runs on a database
+        thread; the row shows as pending until it answers, and the operator
+        can go on to the next player.
+        """
+        self._add_pending_row(pid, codename, team, eqid, arena)
+        self.result_label.setText(f"Looking up player {pid}…")
+
+        def done(f, pid=pid):
+            err = f.exception()
+            self._lookupDone.emit(pid, None if err else f.result(), err)
+        directory.lookup_async(pid).add_done_callback(done)
+
+    def _on_lookup_done(self, pid: int, row, error):
+        pending = self._pending_rows.get(pid)
+        if pending is None:
+            return  # cleared while the lookup was in flight
+        # applied to the arena the player was added in, even if the operator
+        # has switched arenas since
+        team, codename, _item, eqid, arena = pending
+
+        if row and row[1]:
+            pid, codename = row
+            how = "lookup"
+        else:
+            if not codename:
+                if error is not None:
+                    prompt = f"Database unavailable ({error}).\nCodename for player {pid}:"
+                else:
+                    prompt = f"New player {pid}. Enter codename:"
+                text, ok = QInputDialog.getText(self, "New Player", prompt)
+                if not ok or not text.strip() or pid not in self._pending_rows:
+                    self.cancel_pending(pid)
+                    self.result_label.setText("Player creation canceled.")
+                    return
+                codename = text.strip()
+            # stored in the background; retried there if the insert fails
+            directory.put(pid, codename)
+            db.write_behind.put(pid, codename)
+            how = "new"
+
+        self.addPlayerRequested.emit(pid, codename, eqid, team, arena)
+        self.result_label.setText(f"Queued: Player {pid} ({how}), eq {eqid}, team {team}")
         if row:
-            return (row.get("id"), row.get("codename")) if isinstance(row, dict) else row
-        if not codename:
-            text, ok = QInputDialog.getText(self, "New Player", "Enter codename:")
-            if not ok or not text.strip():
-                return None
-            codename = text.strip()
-        row = add_player(pid, codename)
-        return (row.get("id"), row.get("codename")) if isinstance(row, dict) else row
+            self._show_career(pid, codename)
+
+    def _show_career(self, pid: int, codename: str):
+        """Look up lifetime stats (one indexed query) and show them under the result."""
+        self._career_pid = pid
+
+        def done(f):
+            if f.exception() is None:
+                self._careerDone.emit(pid, codename, f.result())
+            # no career table yet / database down: nothing to show
+        db.submit(db.get_career, pid).add_done_callback(done)
+
+    def _on_career_done(self, pid: int, codename: str, stats):
+        if pid != self._career_pid:
+            return  # the operator has moved on to another player
+        self.result_label.setText(f"{self.result_label.text()}\n{codename}: {career.describe(stats)}")
+
+    def _import_roster(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Roster", "", "Rosters (*.csv *.json);;All files (*)")
+        if not path:
+            return
+        try:
+            rows = read_roster_file(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Import Roster", f"Could not read {os.path.basename(path)}:\n{e}")
+            return
 
-    def add_to_roster(self, pid: int, codename: str, team: str):
+        taken = self._eqids | set(self._pending_eq.values())
+        seen_pid, seen_eq, keep, skipped = set(), set(), [], []
+        for pid, eqid, name in rows:
+            if eqid in taken or eqid in seen_eq:
+                skipped.append(f"{pid} (equipment {eqid} taken)")
+            elif pid in seen_pid or pid in self._pending_rows:
+                skipped.append(f"{pid} (listed twice)")
+            else:
+                seen_pid.add(pid)
+                seen_eq.add(eqid)
+                keep.append((pid, eqid, name))
+        self._import_skipped = skipped
+        if not keep:
+            self._report_import([], 0)
+            return
+
+        self.import_btn.setEnabled(False)
+        self.result_label.setText(f"Importing {len(keep)} players…")
+
+        def done(f, rows=keep, arena=self.arena):
+            err = f.exception()
+            self._importDone.emit(rows, None if err else f.result(), err, arena)
+        db.submit(_resolve_roster, keep).add_done_callback(done)
+
+    def _on_import_done(self, rows, result, error, arena):
+        self.import_btn.setEnabled(True)
+        if error is not None:
+            QMessageBox.warning(self, "Import Roster", f"Database unavailable:\n{error}")
+            self.result_label.setText("Import failed.")
+            return
+        names, new = result
+        skipped = self._import_skipped
+        # the tables only show the arena's team sizes while it is shown; the
+        # app checks them against the arena's state otherwise
+        if arena is self.arena:
+            room = {"red": 15 - self.red_table.rowCount(), "green": 15 - self.green_table.rowCount()}
+        else:
+            room = {"red": 15, "green": 15}
+        players = []
+        for pid, eqid, _name in rows:
+            team = "green" if (eqid % 2 == 0) else "red"
+            if pid not in names:
+                skipped.append(f"{pid} (new player, no codename)")
+            elif room[team] <= 0:
+                skipped.append(f"{pid} ({team} team full)")
+            else:
+                room[team] -= 1
+                self._pending_eq[pid] = eqid
+                players.append((pid, names[pid], eqid, team))
+        if players:
+            self.rosterImported.emit(players, arena)
+        self._report_import(players, sum(1 for p in players if p[0] in new))
+
+    def _report_import(self, players, created: int):
+        msg = f"Imported {len(players)} players ({created} new)."
+        if self._import_skipped:
+            msg += f" Skipped {len(self._import_skipped)}."
+            QMessageBox.information(self, "Import Roster",
+                                    "Skipped:\n" + "\n".join(self._import_skipped))
+        self.result_label.setText(msg)
+
+    def _add_pending_row(self, pid: int, codename: Optional[str], team: str, eqid: int, arena):
+        if arena is not self.arena:
+            # another arena is shown; load_rosters lists it when this one is
+            self._pending_rows[pid] = (team, codename, None, eqid, arena)
+            return
+        self._pending_eq[pid] = eqid
         table = self.red_table if team == "red" else self.green_table
         r = table.rowCount()
         table.insertRow(r)
         table.setItem(r, 0, QTableWidgetItem(str(pid)))
+        name_item = QTableWidgetItem(f"{codename or ''} (looking up…)".lstrip())
+        name_item.setForeground(QBrush(QColor("#888")))
+        table.setItem(r, 1, name_item)
+        self._pending_rows[pid] = (team, codename, name_item, eqid, arena)
+
+    def cancel_pending(self, pid: int):
+        """Drop the pending row (and equipment reservation) for pid."""
+        self._pending_eq.pop(pid, None)
+        pending = self._pending_rows.pop(pid, None)
+        if pending is not None and pending[2] is not None:
+            team, _codename, item = pending[:3]
+            table = self.red_table if team == "red" else self.green_table
+            table.removeRow(table.row(item))
+
+    def add_to_roster(self, pid: int, codename: str, team: str):
+        table = self.red_table if team == "red" else self.green_table
+        pending = self._pending_rows.pop(pid, None)
+        if pending is not None and pending[2] is not None:
+            table = self.red_table if pending[0] == "red" else self.green_table
+            r = table.row(pending[2])
+        else:
+            r = table.rowCount()
+            table.insertRow(r)
+            table.setItem(r, 0, QTableWidgetItem(str(pid)))
         name_item = QTableWidgetItem(codename)
         table.setItem(r, 1, name_item)
         eqid = self._pending_eq.pop(pid, None)
@@ -290,6 +560,27 @@ class EntryScreen(QWidget):
         self.result_label.setText("Cleared.")
         self._eqids.clear()
         self._pending_eq.clear()
+        # lookups started in other arenas still land there
+        self._pending_rows = {pid: p for pid, p in self._pending_rows.items() if p[2] is None}
+        self._update_start_enabled()
+
+    def load_rosters(self, players, arena=None):
+        """
+        Show `arena`'s rosters; players: iterable of (pid, codename, team, eqid).
+        Lookups still running keep the arena they were started in and show
+        as pending rows whenever that arena is shown.
+        """
+        self.arena = arena
+        self.red_table.setRowCount(0)
+        self.green_table.setRowCount(0)
+        self._eqids.clear()
+        self._pending_eq.clear()
+        lookups, self._pending_rows = self._pending_rows, {}
+        for pid, codename, team, eqid in players:
+            self._pending_eq[pid] = eqid
+            self.add_to_roster(pid, codename, team)
+        for pid, (team, codename, _item, eqid, owner) in lookups.items():
+            self._add_pending_row(pid, codename, team, eqid, owner)
         self._update_start_enabled()
 
     def _team_counts(self):
@@ -4,7 +4,8 @@ from enum import Enum
 import time
 import math
 from typing import Optional
-from PhotonGame import audio
+from PhotonGame import audio, config
+from PhotonGame.scoring import DIRTY_PARTS, MATCH_SECS, RankIndex, F_PID, F_BASE
 
 DEFAULT_GAME_SECS = 6 * 60        # 6:00
 DEFAULT_PREGAME_SECS = 30
@@ -16,6 +17,240 @@ class Phase(Enum):
     ENDED = 3
 
 
+class RenderScheduler(QtCore.QObject):
+    """
+    Coalesces redraw requests into at most `hz` render calls per second.
+    mark() only records which parts are dirty; render(parts) runs from a
+    single-shot timer, so a burst of N packets costs one redraw, not N.
+    """
+    def __init__(self, render, hz: float = 20, parent=None):
+        super().__init__(parent)
+        self._render = render
+        self._interval = 1.0 / max(1.0, hz)
+        self._last = 0.0
+        self._dirty = set()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def mark(self, *parts):
+        self._dirty.update(parts)
+        if self._timer.isActive():
+            return
+        wait = self._last + self._interval - time.monotonic()
+        self._timer.start(max(0, int(wait * 1000)))
+
+    def flush(self):
+        self._timer.stop()
+        self._last = time.monotonic()
+        parts, self._dirty = self._dirty, set()
+        self._render(parts)
+
+
+class FeedModel(QtCore.QAbstractListModel):
+    """
+    List model over a scoring.FeedBuffer. sync() only emits rowsRemoved for
+    lines the ring evicted and rowsInserted for lines appended since the last
+    sync, so the view never rebuilds the whole list.
+
+    The buffer changes before sync() runs, so rows are addressed by line
+    number (`_first` is the number of row 0, counting every line ever
+    appended) rather than by ring position: a row shows the same line
+    until the remove/insert that moves it has been announced. A row whose
+    line the ring has already evicted is blank until it is removed.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._buf = None
+        self._first = 0
+        self._rows = 0
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        buf = self._buf
+        i = self._first + index.row() - (buf.total - len(buf))
+        return buf[i] if 0 <= i < len(buf) else None
+
+    def sync(self, buf) -> bool:
+        """Catch up with `buf`; returns True if any rows were added."""
+        if buf is not self._buf:
+            self.beginResetModel()
+            self._buf, self._first, self._rows = buf, buf.total - len(buf), len(buf)
+            self.endResetModel()
+            return True
+
+        new = buf.total - (self._first + self._rows)
+        if new <= 0:
+            return False
+        if new >= buf.capacity:
+            # the ring wrapped completely; nothing to keep
+            self.beginResetModel()
+            self._first, self._rows = buf.total - len(buf), len(buf)
+            self.endResetModel()
+            return True
+
+        dropped = self._rows + new - len(buf)
+        if dropped > 0:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, dropped - 1)
+            self._first += dropped
+            self._rows -= dropped
+            self.endRemoveRows()
+        self.beginInsertRows(QtCore.QModelIndex(), self._rows, self._rows + new - 1)
+        self._rows += new
+        self.endInsertRows()
+        return True
+
+
+class TeamTableModel(QtCore.QAbstractTableModel):
+    """
+    One team's score table, ordered by the team's scoring.RankIndex.
+    sync() replays the index's row events (insert/remove/move/changed), so a
+    single tag moves one row and repaints its cells instead of refilling the
+    whole table. The model keeps its own row order (`_order`, eqids) and
+    changes it inside each begin/end pair, so between steps it reports the
+    rows Qt has been told about, not the index's final order.
+    """
+    HEADERS = ("ID", "Codename", "Score", "Tags", "Hit", "FF", "Bases", "Streak")
+    STAT_COLUMNS = (None, None, "score", "tags", "tagged", "ff", "bases", "streak")
+
+    def __init__(self, team: str, base_icon=None, parent=None):
+        super().__init__(parent)
+        self.team = team
+        self._base_icon = base_icon
+        self._state = None
+        self._order = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or self._state is None:
+            return None
+        eqid = self._order[index.row()]
+        players = self._state.players
+        s = players.slot[eqid]     # every ranked eqid is registered
+        col = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            if col == 0:
+                # show player id if known, else fallback to eqid
+                return str(players.pid[s] if players.flags[s] & F_PID else eqid)
+            if col == 1:
+                return players.codename[s] or ""
+            return str(getattr(players, self.STAT_COLUMNS[col])[s])
+        if col == 1:
+            if role == QtCore.Qt.DecorationRole and players.flags[s] & F_BASE:
+                return self._base_icon
+            if role == QtCore.Qt.ToolTipRole:
+                return f"EqID: {eqid}"
+        if col == 7 and role == QtCore.Qt.ToolTipRole:
+            return f"Best streak: {players.best[s]}"
+        return None
+
+    def sync_stats(self):
+        """Repaint the stat columns of every row (they change without moving rows)."""
+        if self._order:
+            self.dataChanged.emit(self.index(0, 3), self.index(len(self._order) - 1, len(self.HEADERS) - 1))
+
+    def sync(self, state):
+        ranks = state.ranks.setdefault(self.team, RankIndex())
+        events = ranks.take_events()
+        if state is not self._state or ("reset",) in events:
+            self.beginResetModel()
+            self._state, self._order = state, list(ranks)
+            self.endResetModel()
+            return
+
+        root = QtCore.QModelIndex()
+        last_col = len(self.HEADERS) - 1
+        order = self._order
+        for ev in events:
+            kind = ev[0]
+            if kind == "insert":
+                self.beginInsertRows(root, ev[1], ev[1])
+                order.insert(ev[1], ev[2])
+                self.endInsertRows()
+            elif kind == "remove":
+                self.beginRemoveRows(root, ev[1], ev[1])
+                del order[ev[1]]
+                self.endRemoveRows()
+            elif kind == "move":
+                src, dst = ev[1], ev[2]
+                # Qt wants the destination as "insert before" in pre-move rows
+                self.beginMoveRows(root, src, src, root, dst + 1 if dst > src else dst)
+                order.insert(dst, order.pop(src))
+                self.endMoveRows()
+                self.dataChanged.emit(self.index(dst, 0), self.index(dst, last_col))
+            else:
+                self.dataChanged.emit(self.index(ev[1], 0), self.index(ev[1], last_col))
+
+
+class ScoreGraph(QtWidgets.QWidget):
+    """
+    Team totals over the match, drawn from a scoring.Timeline. sync() only
+    appends the seconds recorded since the last call to one polygon per
+    team; paintEvent maps the fixed MATCH_SECS x range and the timeline's
+    running min/max onto the widget with one QTransform, so a frame never
+    draws more than MATCH_SECS + 1 points a line or rescans the samples.
+    """
+    COLORS = (("red", QtGui.QColor(220, 50, 50)), ("green", QtGui.QColor(40, 170, 70)))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(80)
+        self._timeline = None
+        self._lines = {"red": QtGui.QPolygonF(), "green": QtGui.QPolygonF()}
+        self._n = 0
+
+    def sync(self, timeline):
+        if timeline is not self._timeline or timeline.last + 1 < self._n:
+            self._timeline = timeline
+            for line in self._lines.values():
+                line.clear()
+            self._n = 0
+        red, green = self._lines["red"], self._lines["green"]
+        for t in range(self._n, timeline.last + 1):
+            red.append(QtCore.QPointF(t, timeline.red[t]))
+            green.append(QtCore.QPointF(t, timeline.green[t]))
+        self._n = timeline.last + 1
+        self.update()
+
+    def paintEvent(self, e):
+        tl = self._timeline
+        if tl is None:
+            return
+        r = QtCore.QRectF(self.rect()).adjusted(4, 4, -4, -4)
+        lo, hi = min(tl.lo, 0), max(tl.hi, 100)
+        xs, ys = r.width() / MATCH_SECS, r.height() / (hi - lo)
+        to_widget = QtGui.QTransform(xs, 0, 0, -ys, r.left(), r.bottom() + lo * ys)
+
+        p = QtGui.QPainter(self)
+        p.setRenderHint(QtGui.QPainter.Antialiasing)
+        p.setTransform(to_widget)
+        axis = QtGui.QPen(QtGui.QColor(128, 128, 128, 120), 0)  # 0 = cosmetic hairline
+        p.setPen(axis)
+        p.drawLine(QtCore.QPointF(0, 0), QtCore.QPointF(MATCH_SECS, 0))
+        start = MATCH_SECS - DEFAULT_GAME_SECS     # end of the countdown
+        p.drawLine(QtCore.QPointF(start, lo), QtCore.QPointF(start, hi))
+        for team, color in self.COLORS:
+            pen = QtGui.QPen(color, 2)
+            pen.setCosmetic(True)
+            p.setPen(pen)
+            p.drawPolyline(self._lines[team])
+        p.end()
+
+
 class GameScreen(QtWidgets.QWidget):
     backRequested = QtCore.pyqtSignal()
     gameStarted = QtCore.pyqtSignal()
@@ -24,11 +259,9 @@ class GameScreen(QtWidgets.QWidget):
     def __init__(self, parent=None, assets_dir="./assets/images"):
         super().__init__(parent)
         self.assets_dir = assets_dir
-        print(assets_dir)
         self._base_icon = None
         #path for baseicon 
         p = os.path.join(assets_dir,"images/baseicon.jpg")
-        print("here", p)
         if os.path.exists(p):
             self._base_icon = QtGui.QIcon(p)
 
@@ -40,6 +273,9 @@ class GameScreen(QtWidgets.QWidget):
         self._music_started = False
         self._flash_on = False
         self.phase = Phase.ENDED
+        self._state = None
+        self._leader = None
+        self._render_sched = RenderScheduler(self._render, hz=config.RENDER_HZ, parent=self)
 
         self._build_ui()
         self._install_timers()
@@ -78,14 +314,24 @@ class GameScreen(QtWidgets.QWidget):
         top.addWidget(self.green_total, 1)
         v.addLayout(top)
 
+        # Score over time
+        self.graph = ScoreGraph(self)
+        v.addWidget(self.graph, 1)
+
         # Middle: play-by-play
-        self.feed = QtWidgets.QListWidget()
+        self.feed_model = FeedModel(self)
+        self.feed = QtWidgets.QListView()
+        self.feed.setModel(self.feed_model)
+        self.feed.setUniformItemSizes(True)
+        self.feed.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         v.addWidget(self.feed, 2)
 
         # Bottom: per-team tables
         bottom = QtWidgets.QHBoxLayout()
-        self.red_table = self._make_table()
-        self.green_table = self._make_table()
+        self.red_model = TeamTableModel("red", self._base_icon, self)
+        self.green_model = TeamTableModel("green", self._base_icon, self)
+        self.red_table = self._make_table(self.red_model)
+        self.green_table = self._make_table(self.green_model)
         bottom.addWidget(self._wrap_group("Red", self.red_table))
         bottom.addWidget(self._wrap_group("Green", self.green_table))
         v.addLayout(bottom, 2)
@@ -109,15 +355,14 @@ class GameScreen(QtWidgets.QWidget):
         if self.countdownLabel:
             self.countdownLabel.setGeometry(self.rect())
 
-    def _make_table(self):
-        t = QtWidgets.QTableWidget(0, 3)
-        t.setHorizontalHeaderLabels(["ID", "Codename", "Score"])
+    def _make_table(self, model):
+        t = QtWidgets.QTableView()
+        t.setModel(model)
         t.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         t.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         t.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
-        t.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeToContents)
+        t.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
         t.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
-        t.horizontalHeader().setSectionResizeMode(2, QtWidgets.QHeaderView.ResizeToContents)
         return t
 
     def _wrap_group(self, title, widget):
@@ -128,68 +373,51 @@ class GameScreen(QtWidgets.QWidget):
 
     # ---- API used by app.py ----
     def refresh(self, state, seconds_left: Optional[int] = None):
+        """
+        Schedule a redraw of whatever `state` marked dirty. Cheap to call per
+        packet/tick; the actual drawing is rate-capped by the RenderScheduler.
+        """
         # (Do NOT update the timer label here; the timer handlers own it)
-        # Totals
-        red_total = sum(s for pid, s in state.score.items() if state.team.get(pid) == "red")
-        green_total = sum(s for pid, s in state.score.items() if state.team.get(pid) == "green")
-        self.red_total.setText(f"Red: {red_total}")
-        self.green_total.setText(f"Green: {green_total}")
-
-        # Feed (show last 200)
-        self.feed.clear()
-        for line in state.feed[-200:]:
-            self.feed.addItem(line)
-        self.feed.scrollToBottom()
-
-        # Tables
-        self._fill_team_table(self.red_table, state, "red")
-        self._fill_team_table(self.green_table, state, "green")
-
-        # Leader for flashing
-        self._leader = "red" if red_total > green_total else ("green" if green_total > red_total else None)
+        if state is not self._state:
+            # new State (e.g. after Clear): everything is stale
+            self._state = state
+            state.mark(*DIRTY_PARTS)
+        if state.dirty:
+            self._render_sched.mark(*state.take_dirty())
 
         # Optional resync example:
         # if self.phase == Phase.RUNNING and seconds_left is not None and self._game_deadline is None:
         #     self._game_deadline = time.monotonic() + int(seconds_left)
 
-    def _fill_team_table(self, table, state, team):
-        # eqid -> player-id mapping, if available
-        eq_to_pid = getattr(state, "eq_to_pid", {})
-
-        rows = []
-        for eqid, t in state.team.items():
-            if t != team:
-                continue
-
-            display_id = eq_to_pid.get(eqid, eqid)  # show player id if known, else fallback to eqid
-            name = state.codename.get(eqid, "")
-            score = state.score.get(eqid, 0)
-            rows.append((eqid, display_id, name, score))
-
-        # sort by score desc
-        rows.sort(key=lambda x: x[3], reverse=True)
-
-        table.setRowCount(len(rows))
-        for r, (eqid, display_id, name, score) in enumerate(rows):
-            # Column 0: player id (display id)
-            table.setItem(r, 0, QtWidgets.QTableWidgetItem(str(display_id)))
+    def _render(self, parts):
+        state = self._state
+        if state is None:
+            return
+        # pick up anything that changed since the last refresh() call
+        parts |= state.take_dirty()
+        # Totals
+        if "totals" in parts:
+            self.red_total.setText(f"Red: {state.totals['red']}")
+            self.green_total.setText(f"Green: {state.totals['green']}")
 
-            # Column 1: codename (+ base icon)
-            name_item = QtWidgets.QTableWidgetItem(name)
-            try:
-                has_icon = (eqid in state.base_icon)
-            except AttributeError:
-                has_icon = False
-            if has_icon and self._base_icon is not None:
-                name_item.setIcon(self._base_icon)
+            # Leader for flashing
+            self._leader = state.leader
 
-            # (Optional) show equipment id as tooltip
-            name_item.setToolTip(f"EqID: {eqid}")
+        if "timeline" in parts:
+            self.graph.sync(state.timeline)
 
-            table.setItem(r, 1, name_item)
+        # Feed (only new lines reach the view)
+        if "feed" in parts and self.feed_model.sync(state.feed):
+            self.feed.scrollToBottom()
 
-            # Column 2: score
-            table.setItem(r, 2, QtWidgets.QTableWidgetItem(str(score)))
+        # Tables (base icon moves arrive as row changes on the affected team)
+        if "red" in parts:
+            self.red_model.sync(state)
+        if "green" in parts:
+            self.green_model.sync(state)
+        if "stats" in parts:
+            self.red_model.sync_stats()
+            self.green_model.sync_stats()
 
     def _pulse(self):
         # Flash the label of the leader
@@ -242,6 +470,26 @@ class GameScreen(QtWidgets.QWidget):
         self.countdownLabel.show()
         self._countdown_timer.start()  # 200 ms interval (set in _install_timers)
 
+    def sync_clock(self, seconds_left: int, running: bool, game_length_secs: int = DEFAULT_GAME_SECS):
+        """
+        Follow a clock kept elsewhere (Controller.seconds_left counts the
+        pre-game countdown plus the match), e.g. after switching arenas.
+        """
+        self.reset_to_idle(default_secs=game_length_secs)
+        if not running:
+            return
+        self._music_started = True  # music belongs to whichever arena started it
+        self._game_secs_remaining = min(seconds_left, game_length_secs)
+        if seconds_left > game_length_secs:
+            self.phase = Phase.COUNTDOWN
+            self._countdown_secs = seconds_left - game_length_secs
+            self._countdown_deadline = time.monotonic() + self._countdown_secs
+            self.countdownLabel.setText(str(self._countdown_secs))
+            self.countdownLabel.show()
+            self._countdown_timer.start()
+        else:
+            self._start_match()
+
     def _tick_countdown(self):
         if self._countdown_deadline is None:
             return
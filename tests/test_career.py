@@ -0,0 +1,15 @@
+from PhotonGame import career, db
+from PhotonGame.career import RosterEntry
+
+
+def test_one_row_per_player_with_two_pieces_of_equipment(monkeypatch):
+    upserted = []
+    monkeypatch.setattr(db, "upsert_career", upserted.append)
+    roster = [
+        RosterEntry(1, 100, "red", "ace", 30, tags=3, ff=1, bases=0),
+        RosterEntry(2, 100, "red", "ace", 100, tags=1, ff=0, bases=1),
+        RosterEntry(3, 200, "green", "bo", 10, tags=1),
+        RosterEntry(4, None, "green", None, 50, tags=5),    # auto-registered
+    ]
+    assert career.record_match(roster, "red") == 2
+    assert upserted == [[(100, 1, 1, 4, 1, 1, 130), (200, 1, 0, 1, 0, 0, 10)]]
@@ -0,0 +1,42 @@
+from PhotonGame.dedupe import DuplicateFilter
+from PhotonGame.net import parse_packet
+from PhotonGame.scoring import State, handle_rx_batch, ack_repeats
+
+MS = 1_000_000
+
+
+def receive(state, dedupe, packets, arrived, acks):
+    events, repeats = dedupe.filter([parse_packet(p) for p in packets], arrived)
+    handle_rx_batch(state, events, acks.append)
+    ack_repeats(state, repeats, acks.append)
+
+
+def game():
+    st = State()
+    st.register_players([(1, "red", "a"), (2, "green", "b")])
+    return st
+
+
+def test_retransmit_after_50ms_is_acked_but_not_scored():
+    st, dedupe, acks = game(), DuplicateFilter(), []
+    receive(st, dedupe, [b"1:2"], [0], acks)
+    # the base station missed our ack and sends the hit again 200 ms later
+    receive(st, dedupe, [b"1:2"], [200 * MS], acks)
+    assert st.players.score_of(1) == 10
+    assert acks == [2, 2]
+    assert dedupe.suppressed == 1
+
+
+def test_repeat_outside_the_window_scores_again():
+    st, dedupe, acks = game(), DuplicateFilter(window_ms=50), []
+    receive(st, dedupe, [b"1:2"], [0], acks)
+    receive(st, dedupe, [b"1:2"], [60 * MS], acks)
+    assert st.players.score_of(1) == 20
+    assert acks == [2, 2]
+
+
+def test_repeat_in_the_same_batch_is_acked_after_scoring():
+    st, dedupe, acks = game(), DuplicateFilter(), []
+    receive(st, dedupe, [b"1:2", b"1:2"], [0, 1 * MS], acks)
+    assert st.players.score_of(1) == 10
+    assert acks == [2, 2]
@@ -0,0 +1,25 @@
+from PhotonGame import snapshot
+from PhotonGame.scoring import State
+
+
+def test_round_trip_keeps_the_timeline():
+    st = State()
+    st.register_players([(1, "red", "a"), (2, "green", "b"), (3, "red", None)])
+    for t in range(40):
+        st.add_points(1 + t % 3, 10 if t % 4 else -10)
+        st.record_second(t)
+
+    snap = snapshot.decode(snapshot.encode(st, 120, True))
+
+    tl, back = st.timeline, snap.state.timeline
+    assert back.last == tl.last == 39
+    assert (back.lo, back.hi) == (tl.lo, tl.hi)
+    assert back.red == tl.red and back.green == tl.green
+    assert back.players == tl.players
+    assert snap.state.totals == st.totals
+    assert (snap.seconds_left, snap.running) == (120, True)
+
+
+def test_round_trip_before_the_first_second():
+    snap = snapshot.decode(snapshot.encode(State(), 390, False))
+    assert snap.state.timeline.last == -1
@@ -0,0 +1,118 @@
+"""
+Post-game analytics for a season of recorded matches.
+
+  python -m tools.analytics [JOURNAL_OR_DIR ...] [--out DIR] [--workers N]
+
+Every .phj journal given (or found in the directories given; default
+PHOTON_JOURNAL_DIR) is analysed by PhotonGame.analytics on a process
+pool. The results go to DIR/matches.csv (one row per match: final
+score, lead changes, friendly-fire rate, base timing, ...) and
+DIR/players.csv (one row per player per match: tags, tags per minute,
+time to first tag, friendly-fire rate, ...).
+
+--ruleset scores with a JSON ruleset instead of the classic rules, and
+--dedupe-ms sets the duplicate window, as PHOTON_RULESET and
+PHOTON_DEDUPE_MS do for the live game.
+
+--check also re-scores every journal packet by packet through the live
+path (DuplicateFilter on the recorded arrival times, then
+scoring.handle_rx_batch) and exits non-zero if any per-player score or
+counter, team total or hit count differs from the analysis.
+"""
+import argparse, glob, os, sys, time
+
+from PhotonGame import config
+from PhotonGame.analytics import analyze_season, export_csv, load_match
+from PhotonGame.dedupe import DuplicateFilter
+from PhotonGame.journal import read_journal, RX
+from PhotonGame.net import parse_packet
+from PhotonGame.rules import TEAM_NAMES, compile_ruleset, load_ruleset
+from PhotonGame.scoring import State, handle_rx_batch
+
+
+def journals(paths):
+    for p in paths:
+        if os.path.isdir(p):
+            yield from sorted(glob.glob(os.path.join(p, "*.phj")))
+        else:
+            yield p
+
+
+def live_state(path: str, spec: dict, window_ms: float) -> State:
+    """The State the live game ends up in for this journal, with the analysis' roster."""
+    m = load_match(path, spec, window_ms)
+    st = State(rules=compile_ruleset(spec))
+    st.register_players([(int(eq), TEAM_NAMES[team - 1], None)
+                         for eq, team in zip(m.eqid, m.team)])
+    dedupe = DuplicateFilter(window_ms, config.DEDUPE_CAPACITY)
+    batch, arrived = [], []
+    for r in read_journal(path)[2]:
+        if r.direction != RX:
+            continue
+        batch.append(parse_packet(r.payload))
+        arrived.append(r.mono_ns)
+        if len(batch) == config.RX_BATCH_MAX:
+            handle_rx_batch(st, dedupe.filter(batch, arrived)[0], lambda _v: None)
+            batch, arrived = [], []
+    if batch:
+        handle_rx_batch(st, dedupe.filter(batch, arrived)[0], lambda _v: None)
+    return st
+
+
+def check(result, spec: dict, window_ms: float) -> list:
+    """Differences between an analysis and live scoring of the same journal."""
+    st = live_state(result.path, spec, window_ms)
+    p = st.players
+    diffs = [f"{team} total {result.summary[team]} != live {st.totals[team]}"
+             for team in TEAM_NAMES if result.summary[team] != st.totals[team]]
+    for row in result.players:
+        s = p.slot[row["eqid"]]
+        live = dict(score=p.score[s], tags=p.tags[s], tagged=p.tagged[s],
+                    friendly_fire=p.ff[s], bases=p.bases[s])
+        diffs += [f"{row['eqid']} {k} {row[k]} != live {v}" for k, v in live.items() if row[k] != v]
+    hits = st.hit_matrix()
+    eqids = [row["eqid"] for row in result.players]
+    for a, tagger in enumerate(eqids):
+        for b, target in enumerate(eqids):
+            if result.hits[a, b] != hits.get((tagger, target), 0):
+                diffs.append(f"hits {tagger}->{target} {result.hits[a, b]} "
+                             f"!= live {hits.get((tagger, target), 0)}")
+    return diffs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("paths", nargs="*", default=[config.JOURNAL_DIR],
+                    help="journals or directories of them")
+    ap.add_argument("--out", default=".", help="directory for matches.csv and players.csv")
+    ap.add_argument("--workers", type=int, default=0, help="processes (default: one per CPU)")
+    ap.add_argument("--ruleset", default=config.RULESET, help="JSON ruleset (default: classic)")
+    ap.add_argument("--dedupe-ms", type=float, default=config.DEDUPE_MS,
+                    help="drop repeats of a packet within this window")
+    ap.add_argument("--check", action="store_true",
+                    help="compare every analysis with live scoring of the same journal")
+    args = ap.parse_args()
+
+    paths = list(journals(args.paths))
+    spec = load_ruleset(args.ruleset)
+    t0 = time.perf_counter()
+    results = analyze_season(paths, spec, args.dedupe_ms, args.workers or None)
+    elapsed = time.perf_counter() - t0
+    packets = sum(r.summary["packets"] for r in results)
+    print(f"{len(results)} of {len(paths)} matches, {packets:,} packets in {elapsed:.2f} s")
+    for path in export_csv(results, args.out):
+        print(f"  wrote {path}")
+
+    if args.check:
+        bad = 0
+        for r in results:
+            diffs = check(r, spec, args.dedupe_ms)
+            if diffs:
+                bad += 1
+                print(f"MISMATCH {r.summary['journal']}: " + "; ".join(diffs[:10]))
+        print(f"check: {len(results) - bad} of {len(results)} matches agree with live scoring")
+        sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
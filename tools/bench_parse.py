@@ -0,0 +1,88 @@
+"""
+Microbenchmark: packet parsing, old text path vs. bytes parser.
+
+  python -m tools.bench_parse [-n 200000]
+
+"before" replays what the receive path used to do per datagram:
+decode+strip in udp_receiver, strip/split/int in handle_rx, then
+split/strip/int again in on_rx to pick a sound effect.
+"after" is net.parse_packet on each datagram's bytes, as the datagram
+transport hands them to it (no decode), plus scoring.handle_rx_batch
+over the parsed events for the full ingest cost.
+"""
+import argparse, random, time
+
+from PhotonGame.net import parse_packet
+from PhotonGame.scoring import State, handle_rx_batch
+
+
+def make_packets(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    red = list(range(1, 31, 2))
+    green = list(range(2, 31, 2))
+    out = []
+    for _ in range(n):
+        r = rnd.random()
+        if r < 0.05:
+            out.append(f"{rnd.choice(red)}:43".encode())
+        elif r < 0.10:
+            out.append(f"{rnd.choice(red)}:{rnd.choice(red)}".encode())
+        else:
+            out.append(f"{rnd.choice(red)}:{rnd.choice(green)}".encode())
+    return out
+
+
+def old_parse(data: bytes):
+    line = data.decode("ascii").strip()          # udp_receiver
+    line = line.strip()                          # handle_rx
+    if ":" in line:
+        tx_str, rhs_str = line.split(":", 1)
+        tx, rhs = int(tx_str), int(rhs_str.strip())
+    else:
+        tx, rhs = -1, int(line)
+    parts = line.split(":", 1)                   # on_rx, for SFX
+    if len(parts) == 2:
+        t, h = parts[0].strip(), parts[1].strip()
+        if h not in ("43", "53"):
+            int(t), int(h)
+    return tx, rhs
+
+
+def bench(label: str, fn, n: int):
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} {n / dt:>12,.0f} packets/s   {dt / n * 1e9:>8.0f} ns/packet")
+    return dt
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", type=int, default=200_000, help="packets per run")
+    args = ap.parse_args()
+
+    packets = make_packets(args.n)
+
+    def run_old():
+        for p in packets:
+            old_parse(p)
+
+    def run_new():
+        for p in packets:
+            parse_packet(p)        # bytes from datagram_received()
+
+    def run_new_scored():
+        st = State()
+        st.register_players([(i, "red" if i % 2 else "green", f"p{i}") for i in range(1, 31)])
+        events = [parse_packet(p) for p in packets]
+        for i in range(0, len(events), 64):
+            handle_rx_batch(st, events[i:i + 64], lambda _v: None)
+
+    before = bench("before: text parse", run_old, args.n)
+    after = bench("after: parse_packet", run_new, args.n)
+    bench("after: parse + score (x64)", run_new_scored, args.n)
+    print(f"parse speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: scoring through a compiled ruleset.
+
+  python -m tools.bench_rules [-n 200000] [--ruleset FILE] [--max-ns 0]
+
+Scores the same pre-parsed packets (mostly enemy tags, some friendly
+fire and base captures) with scoring.handle_rx_batch under the classic
+rules and under a ruleset padded with 500 extra base codes, which must
+cost the same per event since a rule is one dict lookup whatever the
+table size. A run with the per-player combat stats switched off gives
+what the stats cost per event. --ruleset adds a run with a JSON ruleset
+of your own.
+
+Exits non-zero if the large ruleset is more than 20% slower per event
+than the classic one, or if --max-ns is set and any run is slower than
+that, so it can sit in a pre-release check.
+"""
+import argparse, sys, time
+
+from PhotonGame.net import parse_packet
+from PhotonGame.rules import CLASSIC, compile_ruleset, load_rules
+from PhotonGame.scoring import State, handle_rx_batch
+from tools.bench_parse import make_packets
+
+
+def padded(extra: int) -> dict:
+    spec = dict(CLASSIC, name=f"classic+{extra}")
+    spec["bases"] = list(CLASSIC["bases"]) + [
+        {"code": 1000 + i, "team": ("red", "green")[i % 2], "points": 50, "ack": ["shooter"]}
+        for i in range(extra)]
+    return spec
+
+
+class NoStats(State):
+    def count_tag(self, tx, target):
+        pass
+
+    def count_ff(self, tx, target):
+        pass
+
+    def count_base(self, tx):
+        pass
+
+
+def run(rules, events, make_state=State) -> float:
+    """ns/event for one fresh game."""
+    st = make_state(rules=rules)
+    st.register_players([(i, "red" if i % 2 else "green", f"p{i}") for i in range(1, 31)])
+    t0 = time.perf_counter()
+    for i in range(0, len(events), 64):
+        handle_rx_batch(st, events[i:i + 64], lambda _v: None)
+    return (time.perf_counter() - t0) / len(events) * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", type=int, default=200_000, help="events per run")
+    ap.add_argument("--ruleset", help="also time this JSON ruleset")
+    ap.add_argument("--repeat", type=int, default=5, help="runs of each, best one counts")
+    ap.add_argument("--max-ns", type=float, default=0, help="fail above this many ns/event")
+    args = ap.parse_args()
+
+    events = [parse_packet(p) for p in make_packets(args.n)]
+    runs = [("classic", compile_ruleset(CLASSIC)), ("classic + 500 bases", compile_ruleset(padded(500)))]
+    if args.ruleset:
+        runs.append((args.ruleset, load_rules(args.ruleset)))
+
+    runs.append(("classic, stats off", runs[0][1], NoStats))
+    results = {}
+    for _ in range(args.repeat):
+        # interleaved, best of each, so machine noise hits every run alike
+        for label, rules, *make_state in runs:
+            ns = run(rules, events, *make_state)
+            results[label] = min(ns, results.get(label, ns))
+    for label, ns in results.items():
+        print(f"{label:<28} {1e9 / ns:>12,.0f} events/s   {ns:>8.0f} ns/event")
+    print(f"combat stats: {results['classic'] - results['classic, stats off']:.0f} ns/event")
+
+    ok = True
+    ratio = results["classic + 500 bases"] / results["classic"]
+    if ratio > 1.2:
+        print(f"FAIL: 500 extra rules cost {ratio:.2f}x per event")
+        ok = False
+    if args.max_ns and max(results.values()) > args.max_ns:
+        print(f"FAIL: slower than {args.max_ns:.0f} ns/event")
+        ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
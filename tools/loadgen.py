@@ -0,0 +1,252 @@
+"""
+Load generator and ack-latency harness for a running game.
+
+  python -m tools.loadgen --players 15 --rate 200,1000,5000 --duration 10
+
+Plays the role of the arena hardware: sends "tx:hit" packets to the
+game's receive port and listens for acknowledgements on the game's send
+port (PHOTON_RECV_PORT / PHOTON_SEND_PORT, like main.py). Register the
+printed equipment IDs on the entry screen so hits score.
+
+Each comma-separated --rate is run for --duration seconds, followed by
+--drain seconds for late acks, and gets one report line: achieved rate,
+ack loss, reordering and round-trip latency percentiles. The rate where
+loss or p99 climbs is where the build saturates.
+
+Acks carry only an equipment ID (hit player for tags, both players for
+friendly fire, the scorer for base hits), so they are matched FIFO per
+ID; latency is exact while an ID has one hit in flight. An ack that
+matches an older packet than one already acked counts as reordered.
+
+At high rates the same tx:hit pair repeats within the game's duplicate
+window (PHOTON_DEDUPE_MS): it is acked but not scored, so the game's
+scores fall short of what was sent; start the game with
+PHOTON_DEDUPE_MS=0 to score every packet.
+"""
+import argparse, asyncio, os, random, time
+from collections import defaultdict, deque
+
+from PhotonGame import net
+from PhotonGame.net import BASE_CODES, EV_BARE
+
+CONTROL_CODES = (202, 221)      # game start / game over
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.expected = 0
+        self.acked = 0
+        self.reordered = 0
+        self.unexpected = 0
+        self.latencies = []
+        self.t_first = self.t_last = None
+
+    def lost(self) -> int:
+        return self.expected - self.acked
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        n = args.players
+        self.red = list(range(args.first_id, args.first_id + n))
+        self.green = list(range(args.first_id + n, args.first_id + 2 * n))
+        clash = set(self.red + self.green) & set(BASE_CODES + CONTROL_CODES)
+        if clash:
+            raise SystemExit(f"equipment IDs {sorted(clash)} collide with reserved codes; "
+                             "choose another --first-id")
+        self.outstanding = defaultdict(deque)   # ack id -> deque[(seq, t_sent)]
+        self.max_seq_acked = -1
+        self.seq = 0
+        self.stats = Stats()
+        self.started = asyncio.Event()
+        self.game_over = asyncio.Event()
+        ep = net.Endpoints(send_addr=args.host, send_port=args.game_port,
+                           recv_addr=args.bind, recv_port=args.ack_port)
+        # one datagram per callback: timestamps are taken on arrival
+        self.link = net.UdpLink(ep, self.on_batch, max_batch=1, max_wait=0)
+
+    # ---- traffic ----
+    def next_packet(self):
+        """Return (payload, ack ids the game should send back)."""
+        r = self.rnd.random()
+        a = self.args
+        if r < a.base:
+            if self.rnd.random() < 0.5:
+                tx = self.rnd.choice(self.red)
+                return f"{tx}:43", (tx,)
+            tx = self.rnd.choice(self.green)
+            return f"{tx}:53", (tx,)
+        if r < a.base + a.ff:
+            team = self.red if self.rnd.random() < 0.5 else self.green
+            if len(team) < 2:
+                return self.next_tag()
+            tx, hit = self.rnd.sample(team, 2)
+            return f"{tx}:{hit}", (hit, tx)
+        return self.next_tag()
+
+    def next_tag(self):
+        if self.rnd.random() < 0.5:
+            tx, hit = self.rnd.choice(self.red), self.rnd.choice(self.green)
+        else:
+            tx, hit = self.rnd.choice(self.green), self.rnd.choice(self.red)
+        return f"{tx}:{hit}", (hit,)
+
+    def schedule(self, rate: float):
+        """Yield send offsets (seconds from step start) for one step."""
+        a = self.args
+        t = 0.0
+        i = 0
+        while True:
+            if a.pattern == "steady":
+                t = i / rate
+            elif a.pattern == "poisson":
+                t += self.rnd.expovariate(rate)
+            else:   # burst: --burst-size packets back to back, same average rate
+                t = (i // a.burst_size) * a.burst_size / rate
+            if t >= a.duration:
+                return
+            yield t
+            i += 1
+
+    def send(self):
+        payload, acks = self.next_packet()
+        now = time.perf_counter()
+        for ack in acks:
+            self.outstanding[ack].append((self.seq, now))
+        self.seq += 1
+        st = self.stats
+        st.sent += 1
+        st.expected += len(acks)
+        st.t_first = st.t_first or now
+        st.t_last = now
+        self.link.send_bytes(payload.encode("ascii"))
+
+    async def run_step(self, rate: float):
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        for offset in self.schedule(rate):
+            if self.game_over.is_set():
+                break
+            delay = t0 + offset - loop.time()
+            if delay > 0.0005:
+                await asyncio.sleep(delay)
+            self.send()
+            if self.seq % 256 == 0:
+                await asyncio.sleep(0)  # let acks in when running behind
+        try:
+            await asyncio.wait_for(self.game_over.wait(), self.args.drain)
+        except asyncio.TimeoutError:
+            pass
+
+    # ---- acks ----
+    def on_batch(self, events, _arrived):
+        now = time.perf_counter()
+        for ev in events:
+            if ev.kind != EV_BARE:
+                self.stats.unexpected += 1
+                continue
+            if ev.code == 202:
+                self.started.set()
+                continue
+            if ev.code == 221:
+                self.game_over.set()
+                continue
+            q = self.outstanding.get(ev.code)
+            if not q:
+                self.stats.unexpected += 1
+                continue
+            seq, t_sent = q.popleft()
+            self.stats.acked += 1
+            self.stats.latencies.append(now - t_sent)
+            if seq < self.max_seq_acked:
+                self.stats.reordered += 1
+            else:
+                self.max_seq_acked = seq
+
+    # ---- report ----
+    def report(self, rate: float):
+        st = self.stats
+        span = (st.t_last - st.t_first) if st.sent > 1 else 0.0
+        achieved = (st.sent - 1) / span if span > 0 else float(st.sent)
+        lat = sorted(st.latencies)
+
+        def pct(p):
+            if not lat:
+                return float("nan")
+            return lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1e3
+
+        loss = 100.0 * st.lost() / st.expected if st.expected else 0.0
+        print(f"{rate:>8,.0f} {achieved:>9,.0f} {st.sent:>8} {st.acked:>8} {loss:>6.2f}% "
+              f"{st.reordered:>6} {st.unexpected:>6} "
+              f"{pct(50):>8.3f} {pct(90):>8.3f} {pct(99):>8.3f} {pct(99.9):>8.3f} "
+              f"{(lat[-1] * 1e3 if lat else float('nan')):>8.3f}")
+
+    def reset_step(self):
+        self.outstanding.clear()
+        self.max_seq_acked = self.seq - 1
+        self.stats = Stats()
+
+    async def run(self, rates):
+        await self.link.open()
+        a = self.args
+        print(f"red   equipment IDs: {self.red[0]}-{self.red[-1]}")
+        print(f"green equipment IDs: {self.green[0]}-{self.green[-1]}")
+        print(f"sending to {a.host}:{a.game_port}, acks on {a.bind}:{a.ack_port}")
+        if a.wait_start:
+            print("waiting for 202 from the game ...")
+            await self.started.wait()
+        print(f"{'target/s':>8} {'sent/s':>9} {'sent':>8} {'acked':>8} {'loss':>7} "
+              f"{'reord':>6} {'unexp':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+              f"{'p99.9 ms':>8} {'max ms':>8}")
+        try:
+            for rate in rates:
+                self.reset_step()
+                await self.run_step(rate)
+                self.report(rate)
+                if self.game_over.is_set():
+                    print("game sent 221 (game over); stopping")
+                    break
+        finally:
+            self.link.close()
+            await self.link.wait_closed()
+
+
+def parse_rates(text: str):
+    rates = [float(r) for r in text.split(",") if r.strip()]
+    if not rates or min(rates) <= 0:
+        raise argparse.ArgumentTypeError("rates must be positive numbers")
+    return rates
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--players", type=int, default=15, help="players per team (default 15)")
+    ap.add_argument("--first-id", type=int, default=1, help="first equipment ID (default 1)")
+    ap.add_argument("--rate", type=parse_rates, default=[100.0],
+                    help="target events/s; a comma list runs one step per rate")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    ap.add_argument("--pattern", choices=("steady", "poisson", "burst"), default="steady")
+    ap.add_argument("--burst-size", type=int, default=50, help="packets per burst (burst pattern)")
+    ap.add_argument("--ff", type=float, default=0.05, help="friendly-fire ratio (default 0.05)")
+    ap.add_argument("--base", type=float, default=0.02, help="base-hit ratio (default 0.02)")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--drain", type=float, default=2.0, help="seconds to wait for late acks")
+    ap.add_argument("--wait-start", action="store_true", help="wait for 202 before sending")
+    ap.add_argument("--host", default=os.getenv("PHOTON_GAME_ADDR", "127.0.0.1"),
+                    help="address of the game")
+    ap.add_argument("--game-port", type=int, default=int(os.getenv("PHOTON_RECV_PORT", "7501")))
+    ap.add_argument("--bind", default="0.0.0.0")
+    ap.add_argument("--ack-port", type=int, default=int(os.getenv("PHOTON_SEND_PORT", "7500")))
+    args = ap.parse_args()
+    if args.players < 1 or args.burst_size < 1:
+        ap.error("--players and --burst-size must be at least 1")
+    if args.ff < 0 or args.base < 0 or args.ff + args.base > 1:
+        ap.error("--ff and --base must be ratios that sum to at most 1")
+    asyncio.run(Generator(args).run(args.rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Replay a recorded match through the real scoring path.
+
+  python -m tools.replay MATCH.phj [--speed 1] [--headless] [--roster FILE]
+
+MATCH.phj is a journal written during a match (see PhotonGame/journal.py,
+PHOTON_JOURNAL_DIR). Received datagrams are regrouped into the batches
+the transport would have delivered (RX_BATCH_MAX / RX_BATCH_WAIT_MS),
+parsed with net.parse_packet and handed to a Controller, which scores
+them with scoring.handle_rx_batch exactly as in a live game. Without
+--headless a GameScreen shows the match as it replays.
+
+--speed 1 is real time, N is N times faster, 0 is as fast as possible.
+The journal holds datagrams, not the roster: players come from --roster
+(the entry screen's CSV/JSON import format), else from the roster the
+game saved beside the journal, else from every equipment ID seen, with
+the entry screen's team rule (even = green).
+
+The report gives final scores, events/s, per-stage timing (parse, score,
+render) and whether the replayed acknowledgements match the recorded ones.
+"""
+import argparse, asyncio, os, sys, time
+
+from PhotonGame import config
+from PhotonGame.journal import read_journal, load_roster, TX
+from PhotonGame.net import parse_packet, BASE_CODES, EV_TAG, EV_BASE
+
+
+def load_batches(records, max_batch: int, max_wait_ns: int):
+    """
+    [(deliver_mono_ns, [payload, ...], [arrival mono_ns, ...])] plus the
+    recorded tx payloads. Duplicate suppression uses the recorded arrival
+    times, so it does not depend on how the batches are cut.
+    """
+    batches, acks = [], []
+    start, batch, arrived = None, [], []
+    for r in records:
+        if r.direction == TX:
+            acks.append(r.payload)
+            continue
+        if batch and (len(batch) >= max_batch or r.mono_ns - start > max_wait_ns):
+            batches.append((start + max_wait_ns, batch, arrived))
+            batch, arrived = [], []
+        if not batch:
+            start = r.mono_ns
+        batch.append(r.payload)
+        arrived.append(r.mono_ns)
+    if batch:
+        batches.append((start + max_wait_ns, batch, arrived))
+    return batches, acks
+
+
+def infer_roster(batches):
+    seen = set()
+    for _t, payloads, _arrived in batches:
+        for p in payloads:
+            ev = parse_packet(p)
+            if ev.kind in (EV_TAG, EV_BASE):
+                seen.add(ev.tx)
+            if ev.kind == EV_TAG:
+                seen.add(ev.code)
+    return [(eq, None, eq, "green" if eq % 2 == 0 else "red")
+            for eq in sorted(seen) if eq >= 0 and eq not in BASE_CODES]
+
+
+class StageTimer:
+    def __init__(self):
+        self.total = {}
+        self.calls = {}
+
+    def wrap(self, name, fn):
+        def timed(*args):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.total[name] = self.total.get(name, 0.0) + time.perf_counter() - t0
+                self.calls[name] = self.calls.get(name, 0) + 1
+        return timed
+
+
+async def replay(ctrl, batches, speed: float, timer: StageTimer, yield_every: int):
+    parse = timer.wrap("parse", lambda payloads: [parse_packet(p) for p in payloads])
+    score = timer.wrap("score", ctrl._on_events)
+    loop = asyncio.get_running_loop()
+    t0, first = loop.time(), batches[0][0] if batches else 0
+    n = 0
+    for i, (at, payloads, arrived) in enumerate(batches):
+        if speed > 0:
+            delay = t0 + (at - first) / 1e9 / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif yield_every and i % yield_every == 0:
+            await asyncio.sleep(0)  # let the screen render
+        score(parse(payloads), arrived)
+        n += len(payloads)
+    return n, loop.time() - t0
+
+
+def report(ctrl, n_events: int, wall: float, timer: StageTimer, recorded_acks, replayed_acks):
+    st = ctrl.state
+    print(f"\nfinal score   red {st.totals['red']}   green {st.totals['green']}")
+    for team in ("red", "green"):
+        players = sorted(((score, eq) for eq, _pid, t, _name, score in st.players.rows()
+                          if t == team), reverse=True)
+        print(f"  {team:<5} " + "  ".join(f"{eq}:{s}" for s, eq in players))
+    print(f"\n{n_events} events in {wall:.3f} s  ->  {n_events / wall if wall else 0:,.0f} events/s")
+    for name in ("parse", "score", "render"):
+        t = timer.total.get(name, 0.0)
+        calls = timer.calls.get(name, 0)
+        per = t / n_events * 1e6 if n_events else 0.0
+        print(f"  {name:<7} {t * 1e3:>9.1f} ms  {calls:>7} calls  {per:>7.2f} us/event")
+    ok = "match" if replayed_acks == recorded_acks else "DIFFER"
+    print(f"acks: recorded {len(recorded_acks)}, replayed {len(replayed_acks)} ({ok})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("journal", help="match journal (.phj)")
+    ap.add_argument("--speed", type=float, default=1.0,
+                    help="1 = real time, N = N x faster, 0 = as fast as possible")
+    ap.add_argument("--headless", action="store_true", help="score only; no GameScreen")
+    ap.add_argument("--roster", help="roster CSV/JSON (default: the saved roster, "
+                                     "else inferred from the journal)")
+    args = ap.parse_args()
+
+    arena, match_id, records = read_journal(args.journal)
+    batches, recorded = load_batches(records, config.RX_BATCH_MAX,
+                                     int(config.RX_BATCH_WAIT_MS * 1e6))
+    # acks the game sent in answer to hits (not 202/221 or roster broadcasts)
+    recorded_acks = [p for p in recorded if p not in (b"202", b"221")]
+    print(f"{arena} match {match_id}: {sum(len(b) for _t, b, _a in batches)} datagrams "
+          f"in {len(batches)} batches")
+
+    if args.headless:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5 import QtWidgets
+    from qasync import QEventLoop
+    from PhotonGame import ASSETS_DIR
+    from PhotonGame.app import Controller
+    from PhotonGame.ui.game import GameScreen
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
+
+    if args.roster:
+        from PhotonGame.ui.entry import read_roster_file
+        roster = [(pid, name, eq, "green" if eq % 2 == 0 else "red")
+                  for pid, eq, name in read_roster_file(args.roster)]
+    else:
+        saved = load_roster(args.journal)
+        roster = ([(r["pid"], r["codename"], r["eqid"], r["team"]) for r in saved]
+                  if saved is not None else infer_roster(batches))
+
+    ctrl = Controller(arena, snapshots=False)
+    replayed_acks = []
+    ctrl.send_int = lambda v: replayed_acks.append(str(int(v)).encode("ascii"))
+    for pid, name, eq, team in roster:
+        ctrl.set_player(eq, team, codename=name, pid=pid)
+
+    timer = StageTimer()
+    game = None
+    if args.headless:
+        ctrl._on_rx = lambda kinds: None
+    else:
+        game = GameScreen(None, assets_dir=ASSETS_DIR)
+        game.setWindowTitle(f"Replay: {arena} {match_id}")
+        game.resize(1024, 640)
+        game.show()
+        game._render_sched._render = timer.wrap("render", game._render_sched._render)
+        ctrl._on_rx = lambda kinds: game.refresh(ctrl.state, ctrl.seconds_left)
+        game.refresh(ctrl.state, ctrl.seconds_left)
+
+    with loop:
+        n, wall = loop.run_until_complete(
+            replay(ctrl, batches, args.speed, timer, 0 if args.headless else 64))
+        if game is not None:
+            game._render_sched.flush()
+        report(ctrl, n, wall, timer, recorded_acks, replayed_acks)
+        if game is not None:
+            print("close the window to exit")
+            app.lastWindowClosed.connect(loop.stop)
+            loop.run_forever()
+
+
+if __name__ == "__main__":
+    main()
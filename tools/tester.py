@@ -4,46 +4,38 @@ from PhotonGame import net
 # --- simple callback to handle incoming messages ---
 counter = 0
 
-async def handle_message(msg: str):
+def handle_batch(events, _arrived):
     global counter
-    print(f"[GAME] Received event: {msg}")
-
-    # Example: parse shooter:victim or shooter:base
-    try:
-        shooter, target = msg.split(":")
-    except ValueError:
-        shooter, target = msg, None
-
-    # Send back a simple ACK for each message
-    await send_queue.put("This")
-
-    # After 15 events, tell tester we're done
-    counter += 1
-    if counter >= 15:
-        await send_queue.put("221")
-        print("[GAME] Sent 221, shutting down soon…")
-        # Cancel loop after a short delay
-        await asyncio.sleep(1)
-        for task in asyncio.all_tasks():
-            task.cancel()
+    for ev in events:
+        print(f"[GAME] Received event: {ev}")
+
+        # Send back a simple ACK for each message (the id that was hit)
+        link.send_int(ev.code if ev.code >= 0 else 0)
+
+        # After 15 events, tell tester we're done
+        counter += 1
+        if counter == 15:
+            link.send_int(221)
+            print("[GAME] Sent 221, shutting down soon…")
+            asyncio.get_running_loop().call_later(1, done.set)
 
 # --- driver entry point ---
 async def main():
-    global send_queue
-    send_queue = asyncio.Queue()
+    global link, done
+    done = asyncio.Event()
 
     # kick off sender & receiver
-    sender_task = asyncio.create_task(net.udp_sender(send_queue))
-    receiver_task = asyncio.create_task(net.udp_receiver(handle_message))
+    link = net.UdpLink(net.endpoints_from_env(), handle_batch)
+    await link.open()
 
     # Initial handshake: tell tester we're ready
-    await send_queue.put("202")
+    link.send_int(202)
     print("[GAME] Sent 202, waiting for tester events…")
 
-    await asyncio.gather(sender_task, receiver_task)
+    await done.wait()
+    link.close()
+    await link.wait_closed()
+    print("[GAME] Finished.")
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except asyncio.CancelledError:
-        print("[GAME] Finished.")
+    asyncio.run(main())